@@ -9,10 +9,14 @@ import time
 import streamlit as st
 from streamlit.logger import get_logger
 from utils import load_embedding_model
+from graph.reachability import ReachabilityIndex
+from graph.snapshot import GraphSnapshot
+from tara.incremental import content_hash, serialize_rows
 from functools import cache
 from langchain_community.graphs import Neo4jGraph
 from pathlib import Path
 import json
+import pandas as pd
 
 from langchain_community.vectorstores import Neo4jVector
 
@@ -25,6 +29,116 @@ NEO4J_DATABASE = st.secrets["NEO4J_DATABASE"]
 OLLAMA_BASE_URL = st.secrets["OLLAMA_BASE_URL"]
 EMBEDDING_MODEL_NAME = st.secrets["EMBEDDING_MODEL"]
 
+SECURITY_PROPERTIES_QUERY = "MATCH (t:TARA {object_id:$tara_handle})-[:Security_Property_List]->(p:Security_Property_Catalog)-[:Security_Property]->(m:Security_Property) return m.name as p_name"
+
+ITEM_ELEMENTS_QUERY = """MATCH (p:Conceptual_System_Model {name: $item_name})
+CALL apoc.path.subgraphAll(p, {
+    relationshipFilter: "System_Component|Subcomponent|Communication_Medium|Stored_Information",
+    labelFilter:"-System_Stakeholder",
+    minLevel: 1,
+    maxLevel: 4
+})
+YIELD nodes, relationships
+UNWIND relationships as rel
+UNWIND nodes as nd
+return type(rel) as rel_type, startNode(rel).name as rel_start, endNode(rel).name as rel_end, nd.name as node_name, nd.description as node_description, nd.object_id as node_id
+"""
+
+ITEM_DEFINITIONS_QUERY = (
+    "MATCH (m:TARA)-[:Security_Item_Definition]->(n:Conceptual_System_Model)"
+    + " RETURN n.name as item_name, n.object_id as item_handle, m.name as tara_name, m.object_id as tara_handle"
+)
+
+ITEM_NODES_QUERY = """MATCH (p:Conceptual_System_Model {name: $item_name})
+CALL apoc.path.subgraphNodes(p, {
+    relationshipFilter: "System_Component|Subcomponent|Communication_Medium|Stored_Information",
+    labelFilter:"-System_Stakeholder",
+    minLevel: 1,
+    maxLevel: 4
+})
+YIELD node
+"""
+
+ITEM_ATTACK_EDGES_QUERY = (
+    ITEM_NODES_QUERY
+    + "RETURN node.object_id AS node_id, [(node)-[:Possible_Attack]->(d:Item) | d.object_id] AS targets"
+)
+
+# Possible_Attack edges are derived from these relations; True derives an edge
+# in the direction of the relation, False in the opposite direction
+ATTACK_RULES = {
+    "Input_Interface": False,
+    "Output_Interface": True,
+    "Stored_Information": True,
+    # "Subcomponent": True,
+    # "System_Component": True,
+    # "External_Component": False,
+}
+
+# relations copied into in-process graph snapshots of an item
+SNAPSHOT_RELATIONS = [
+    "System_Component",
+    "Subcomponent",
+    "Communication_Medium",
+    "Stored_Information",
+    "Input_Interface",
+    "Output_Interface",
+    "Possible_Attack",
+]
+
+ITEM_GRAPH_QUERY = (
+    ITEM_NODES_QUERY
+    + "RETURN node.object_id AS node_id, node.name AS node_name, node.description AS node_description, [(node)-[r]->(d:Item) WHERE type(r) IN $rel_types | [type(r), d.object_id]] AS edges"
+)
+
+# every import and every change to the Possible_Attack edges bumps this
+# version, which invalidates the reachability indexes stored on the item
+# definitions and the in-process graph snapshots. Reading it writes nothing;
+# the version node is only created by the first bump.
+ATTACK_GRAPH_VERSION_QUERY = "OPTIONAL MATCH (g:Attack_Graph {name: 'Possible_Attack'}) RETURN coalesce(g.version, 0) AS version"
+
+BUMP_ATTACK_GRAPH_VERSION_QUERY = "MERGE (g:Attack_Graph {name: 'Possible_Attack'}) SET g.version = coalesce(g.version, 0) + 1"
+
+# TARA results are stored per run as a TARA_Run node linked to the item
+# definition and its TARA. Result rows are content addressed (TARA_Row nodes
+# merged on their hash), so rows unchanged between runs are shared and two
+# runs differ exactly by the rows they do not share.
+CREATE_TARA_RUN_QUERY = """MATCH (m:Conceptual_System_Model {object_id: $item_handle})
+OPTIONAL MATCH (m)<-[:Run_Item]-(prev:TARA_Run)
+WITH m, coalesce(max(prev.version), 0) + 1 AS version
+CREATE (r:TARA_Run {run_id: $run_id, version: version, created: datetime(), columns: $columns, inputs: $inputs})
+CREATE (r)-[:Run_Item]->(m)
+WITH r
+OPTIONAL MATCH (t:TARA {object_id: $tara_handle})
+FOREACH (_ IN CASE WHEN t IS NULL THEN [] ELSE [1] END | CREATE (t)-[:TARA_Run]->(r))
+RETURN r.version AS version
+"""
+
+INSERT_TARA_ROWS_QUERY = """MATCH (r:TARA_Run {run_id: $run_id})
+UNWIND $rows AS row
+MERGE (n:TARA_Row {hash: row.hash}) ON CREATE SET n.step = row.step, n.data = row.data
+CREATE (r)-[:Run_Result {step: row.step, position: row.position}]->(n)
+"""
+
+# the latest run unless a version is given
+LOAD_TARA_RUN_QUERY = """MATCH (:Conceptual_System_Model {object_id: $item_handle})<-[:Run_Item]-(r:TARA_Run)
+WHERE $version IS NULL OR r.version = $version
+WITH r ORDER BY r.version DESC LIMIT 1
+OPTIONAL MATCH (r)-[res:Run_Result]->(n:TARA_Row)
+WITH r, res, n ORDER BY res.position
+RETURN r.version AS version, r.columns AS columns, r.inputs AS inputs,
+    [x IN collect([res.step, n.hash, n.data]) WHERE x[0] IS NOT NULL] AS rows
+"""
+
+TARA_RUN_HISTORY_QUERY = """MATCH (:Conceptual_System_Model {object_id: $item_handle})<-[:Run_Item]-(r:TARA_Run)
+OPTIONAL MATCH (r)-[res:Run_Result]->()
+WITH r, res.step AS step, count(res) AS row_count
+WITH r, [p IN collect([step, row_count]) WHERE p[0] IS NOT NULL] AS pairs
+WITH r, apoc.map.fromPairs(pairs) AS row_counts
+RETURN r.version AS version, toString(r.created) AS created, row_counts
+ORDER BY version DESC
+"""
+
 driver = GraphDatabase.driver(
     NEO4J_URI, database=NEO4J_DATABASE, auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
 )
@@ -69,11 +183,20 @@ class Neo4j:
 @cache
 class SWNeo4j(Neo4j):
     object_type = "Item"
+    attack_rules = ATTACK_RULES
 
     def __init__(self) -> None:
         super().__init__()
 
         self.init_db(SWNeo4j.object_type)
+        self.reachability_indexes = {}
+        self.graph_snapshots = {}
+        with driver.session() as session:
+            # attack path and element lookups start from an item name
+            session.run(
+                f"CREATE INDEX {SWNeo4j.object_type}Name IF NOT EXISTS FOR (i:{SWNeo4j.object_type}) ON (i.name);"
+            )
+        driver.close()
 
     @staticmethod
     def vector(embeddings):
@@ -100,9 +223,7 @@ class SWNeo4j(Neo4j):
     def find_security_properties(self, tara_handle):
         with driver.session() as session:
             params = {"tara_handle": tara_handle}
-            query = "MATCH (t:TARA {object_id:$tara_handle})-[:Security_Property_List]->(p:Security_Property_Catalog)-[:Security_Property]->(m:Security_Property) return m.name as p_name"
-
-            props = session.run(query=query, parameters=params)
+            props = session.run(query=SECURITY_PROPERTIES_QUERY, parameters=params)
             for d in props:
                 yield d
         driver.close()
@@ -110,21 +231,7 @@ class SWNeo4j(Neo4j):
     def find_item_elements(self, item_name):
         with driver.session() as session:
 
-            query = """MATCH (p:Conceptual_System_Model {name: $item_name})
-            CALL apoc.path.subgraphAll(p, {
-                relationshipFilter: "System_Component|Subcomponent|Communication_Medium|Stored_Information",
-                labelFilter:"-System_Stakeholder",
-                minLevel: 1,
-                maxLevel: 4
-                
-            })
-            YIELD  nodes, relationships            
-            UNWIND relationships as rel
-            UNWIND nodes as nd
-            return type(rel) as rel_type, startNode(rel).name as rel_start, endNode(rel).name as rel_end, nd.name as node_name, nd.description as node_description, nd.object_id as node_id
-
-            """
-            result = session.run(query, parameters={"item_name": item_name})
+            result = session.run(ITEM_ELEMENTS_QUERY, parameters={"item_name": item_name})
             for d in result:
                 yield d
         driver.close()
@@ -133,134 +240,441 @@ class SWNeo4j(Neo4j):
 
         with driver.session() as session:
 
-            query = (
-                "MATCH (m:TARA)-[:Security_Item_Definition]->(n:Conceptual_System_Model)"
-                + " RETURN n.name as item_name, n.object_id as item_handle, m.name as tara_name, m.object_id as tara_handle"
-            )
-
-            defs = session.run(query=query, parameters={})
+            defs = session.run(query=ITEM_DEFINITIONS_QUERY, parameters={})
             for d in defs:
                 yield d
         driver.close()
 
-    def insert_data(self, sw_items):
+    def insert_data(self, sw_items, batch_size=1000, update_attack_graph=True):
 
         with driver.session() as session:
-            for sw_item in sw_items.values():
-
-                params, query = self.generate_node_query(sw_item)
-                session.run(query, parameters=params)
-            for sw_item in sw_items.values():
-                for part_handle, part_type in sw_item["parts"].items():
-                    params, query = self.generate_relation_query(
-                        sw_item, sw_items[part_handle], part_type
+            if update_attack_graph:
+                old_relations = self.find_attack_rule_relations(session, sw_items)
+            for query, rows in self.generate_node_batches(sw_items, batch_size):
+                session.run(query, parameters={"rows": rows})
+            for query, rows in self.generate_relation_batches(sw_items, batch_size):
+                session.run(query, parameters={"rows": rows})
+
+            if update_attack_graph:
+                # attack-rule relations that disappeared from the re-imported
+                # items are removed, and only the endpoints of added or removed
+                # relations get their Possible_Attack edges re-derived
+                new_relations = {
+                    (sw_item["handle"], part_type, part_handle)
+                    for sw_item in sw_items.values()
+                    for part_handle, part_type in sw_item["parts"].items()
+                    if part_type in self.attack_rules
+                }
+                removed = old_relations - new_relations
+                if removed:
+                    query = "UNWIND $rows AS row MATCH (s:Item {object_id: row.s_handle})-[r]->(d:Item {object_id: row.d_handle}) WHERE type(r) = row.rel_type DELETE r"
+                    session.run(
+                        query,
+                        parameters={
+                            "rows": [
+                                {"s_handle": s, "rel_type": t, "d_handle": d}
+                                for s, t, d in removed
+                            ]
+                        },
                     )
-
-                    session.run(query, parameters=params)
+                changed = {
+                    handle
+                    for s, _, d in removed | (new_relations - old_relations)
+                    for handle in (s, d)
+                }
+            session.run(BUMP_ATTACK_GRAPH_VERSION_QUERY)
 
         driver.close()
 
-    def generate_relation_query(self, src_item, dest_item, rel_label):
-        params = {
-            "s_handle": src_item["handle"],
-            "d_handle": dest_item["handle"],
-        }
-
-        query = (
-            "MATCH (s:"
-            + src_item["type"]
-            + " {object_id: $s_handle}) MATCH (d:"
-            + dest_item["type"]
-            + " {object_id: $d_handle}) MERGE (d)<-[:"
-            + rel_label
-            + "]-(s);"
+        if update_attack_graph and changed:
+            self.update_attack_graph(changed)
+
+    def find_attack_rule_relations(self, session, sw_items):
+        query = "UNWIND $handles AS h MATCH (s:Item {object_id: h})-[r]->(d:Item) WHERE type(r) IN $rel_types RETURN s.object_id AS s_handle, type(r) AS rel_type, d.object_id AS d_handle"
+        result = session.run(
+            query,
+            parameters={
+                "handles": list(sw_items),
+                "rel_types": list(self.attack_rules),
+            },
         )
+        return {(r["s_handle"], r["rel_type"], r["d_handle"]) for r in result}
+
+    def generate_node_batches(self, sw_items, batch_size):
+        # labels cannot be parameterized, so items are grouped by type and
+        # each group is written with one UNWIND query per batch
+        rows_by_type = {}
+        for sw_item in sw_items.values():
+            rows_by_type.setdefault(sw_item["type"], []).append(
+                {
+                    "handle": sw_item["handle"],
+                    "name": sw_item["name"],
+                    "description": sw_item["description"],
+                    "embedding": "",
+                    "attributes": {
+                        attr["name"].lower(): attr["value"]
+                        for attr in sw_item["attributes"]
+                    },
+                }
+            )
 
-        return params, query
+        for item_type, rows in rows_by_type.items():
+            # merging on Item alone keeps matching nodes imported with another
+            # label set (e.g. before the metamodel was loaded), so that the
+            # Item.object_id constraint holds; the type labels are added after
+            extra_labels = [l for l in item_type.split(":") if l and l != "Item"]
+            if any("`" in l for l in extra_labels):
+                raise ValueError(f"invalid item type label: {item_type}")
+            query = (
+                "UNWIND $rows AS row MERGE (i:Item {object_id: row.handle}) ON CREATE SET i.name = row.name, i.description = row.description, i.embedding = row.embedding, i += row.attributes"
+                + (
+                    " SET i:" + ":".join(f"`{l}`" for l in extra_labels)
+                    if extra_labels
+                    else ""
+                )
+                + ";"
+            )
+            for start in range(0, len(rows), batch_size):
+                yield query, rows[start : start + batch_size]
+
+    def generate_relation_batches(self, sw_items, batch_size):
+        rows_by_label = {}
+        for sw_item in sw_items.values():
+            for part_handle, part_type in sw_item["parts"].items():
+                rows_by_label.setdefault(part_type, []).append(
+                    {"s_handle": sw_item["handle"], "d_handle": part_handle}
+                )
 
-    def find_paths_to_asset(self, asset_name):
-        params = {"asset": asset_name}
-        with driver.session() as session:
-            query = "MATCH paths = (s)-[:Possible_Attack*]->(d {name:$asset} ) WITH reduce(output = [], n IN nodes(paths) | output + n ) as nodeCollection UNWIND nodeCollection as client RETURN client.name;"
-            paths = session.run(query, params)
-            for p in paths:
-                yield p
-        session.close()
+        for rel_label, rows in rows_by_label.items():
+            query = (
+                "UNWIND $rows AS row MATCH (s:Item {object_id: row.s_handle}) MATCH (d:Item {object_id: row.d_handle}) MERGE (d)<-[:"
+                + rel_label
+                + "]-(s);"
+            )
+            for start in range(0, len(rows), batch_size):
+                yield query, rows[start : start + batch_size]
 
-    def add_attack_graph(self):
+    def find_item_graph(self, item_name, rel_types=SNAPSHOT_RELATIONS):
         with driver.session() as session:
-            rel_labels = {
-                "Input_Interface": False,
-                "Output_Interface": True,
-                "Stored_Information": True,
-                # "Subcomponent": True,
-                # "System_Component": True,
-                # "External_Component": False,
-            }
+            result = session.run(
+                ITEM_GRAPH_QUERY,
+                parameters={"item_name": item_name, "rel_types": rel_types},
+            )
+            for d in result:
+                yield d
+        driver.close()
 
-            for rel_label in rel_labels:
+    def get_graph_snapshot(self, item_name):
+        """Return an in-process snapshot of the item subgraph, reloading it
+        only when the graph version has changed since it was taken."""
+        version = self.attack_graph_version()
+        snapshot = self.graph_snapshots.get(item_name)
+        if snapshot is None or snapshot.version != version:
+            snapshot = GraphSnapshot.from_records(
+                list(self.find_item_graph(item_name)), version
+            )
+            self.graph_snapshots[item_name] = snapshot
+        return snapshot
+
+    def find_paths_to_asset(
+        self, item_name, asset_name, k=3, entry_points=None, node_costs=None
+    ):
+        """Yield the k cheapest simple attack paths within an item ending at
+        the asset, as ordered node id and name lists. Paths start at the given
+        entry point names, by default at the elements without incoming
+        Possible_Attack edges that reach the asset according to the item's
+        reachability index. The cost of a path is the
+        sum of node_costs (by element name) over its nodes, 1 where unset."""
+        snapshot = self.get_graph_snapshot(item_name)
+        names = dict(zip(snapshot.node_ids, snapshot.names))
+        costs = {
+            node_id: node_costs[name]
+            for node_id, name in names.items()
+            if node_costs and name in node_costs
+        }
+        for target in [i for i, name in names.items() if name == asset_name]:
+            if entry_points is None:
+                sources = self.get_reachability_index(item_name).entry_points_for(
+                    target
+                )
+            else:
+                sources = [i for i, name in names.items() if name in entry_points]
+            for cost, path in snapshot.cheapest_paths(sources, target, k, costs):
+                yield {
+                    "node_ids": path,
+                    "node_names": [names[i] for i in path],
+                    "hops": len(path) - 1,
+                    "cost": cost,
+                }
+
+    def add_attack_graph(self, item_name=None, rules=None, batch_size=10000):
+        """Derive Possible_Attack edges from the attack rules, for the whole
+        database or only for the nodes of one item."""
+        rules = rules or self.attack_rules
+        scope = "item" if item_name else "all"
+        with driver.session() as session:
+            for rel_label, forward in rules.items():
                 params, query = self.generate_attack_relation_query(
-                    rel_label, "Possible_Attack", rel_labels[rel_label]
+                    rel_label, "Possible_Attack", forward, scope
                 )
+                params.update(
+                    batch_size=batch_size, params={"item_name": item_name}
+                )
+                session.run(query, parameters=params)
+            session.run(BUMP_ATTACK_GRAPH_VERSION_QUERY)
+        driver.close()
 
+        item_names = (
+            [item_name]
+            if item_name
+            else [d["item_name"] for d in self.find_item_definitions()]
+        )
+        for name in item_names:
+            self.build_reachability_index(name)
+
+    def update_attack_graph(self, handles, rules=None, batch_size=10000):
+        """Re-derive only the Possible_Attack edges incident to the given
+        items, e.g. the endpoints of interfaces that were added or removed."""
+        rules = rules or self.attack_rules
+        handles = list(handles)
+        with driver.session() as session:
+            session.run(
+                "CALL apoc.periodic.iterate($match, 'DELETE r', {batchSize: $batch_size, params: {handles: $handles}})",
+                parameters={
+                    "match": "UNWIND $handles AS h MATCH (:Item {object_id: h})-[r:Possible_Attack]-() RETURN DISTINCT r",
+                    "batch_size": batch_size,
+                    "handles": handles,
+                },
+            )
+            for rel_label, forward in rules.items():
+                params, query = self.generate_attack_relation_query(
+                    rel_label, "Possible_Attack", forward, "handles"
+                )
+                params.update(batch_size=batch_size, params={"handles": handles})
                 session.run(query, parameters=params)
+            session.run(BUMP_ATTACK_GRAPH_VERSION_QUERY)
         driver.close()
 
-    def delete_attack_graph(self):
+    def delete_attack_graph(self, item_name=None, batch_size=10000):
         with driver.session() as session:
-            query = "MATCH (n)-[r:Possible_Attack]->() DELETE r"
-            session.run(query)
+            if item_name:
+                match = ITEM_NODES_QUERY + "MATCH (node)-[r:Possible_Attack]-() RETURN DISTINCT r"
+            else:
+                match = "MATCH (n)-[r:Possible_Attack]->() RETURN r"
+            session.run(
+                "CALL apoc.periodic.iterate($match, 'DELETE r', {batchSize: $batch_size, params: {item_name: $item_name}})",
+                parameters={
+                    "match": match,
+                    "batch_size": batch_size,
+                    "item_name": item_name,
+                },
+            )
+            session.run(BUMP_ATTACK_GRAPH_VERSION_QUERY)
         driver.close()
 
-    def generate_attack_relation_query(self, rel_label, attack_label, forward=True):
+    def attack_graph_version(self):
+        with driver.session() as session:
+            version = session.run(ATTACK_GRAPH_VERSION_QUERY).single()["version"]
+        driver.close()
+        return version
 
-        query = (
-            "MATCH (s:Item)-[r1:"
-            + rel_label
-            + "]->(d:Item) MERGE (s)-[r2:"
-            + attack_label
-            + "]->(d);"
-        )
+    def build_reachability_index(self, item_name):
+        """Compute the reachability index of the Possible_Attack edges within
+        an item and store it on the item definition node."""
+        with driver.session() as session:
+            version = session.run(ATTACK_GRAPH_VERSION_QUERY).single()["version"]
+            rows = list(
+                session.run(ITEM_ATTACK_EDGES_QUERY, parameters={"item_name": item_name})
+            )
+            index = ReachabilityIndex.build(
+                [r["node_id"] for r in rows],
+                [(r["node_id"], target) for r in rows for target in r["targets"]],
+            )
+            query = "MATCH (p:Conceptual_System_Model {name: $item_name}) SET p.reachability_index = $index, p.reachability_version = $version"
+            session.run(
+                query,
+                parameters={
+                    "item_name": item_name,
+                    "index": json.dumps(index.to_dict()),
+                    "version": version,
+                },
+            )
+        driver.close()
 
-        if not forward:
-            query = (
-                "MATCH (s:Item)-[r1:"
+        self.reachability_indexes[item_name] = (version, index)
+        return index
+
+    def get_reachability_index(self, item_name):
+        """Return the reachability index of an item, rebuilding it if the
+        attack graph changed since it was computed."""
+        version = self.attack_graph_version()
+        if item_name in self.reachability_indexes:
+            cached_version, index = self.reachability_indexes[item_name]
+            if cached_version == version:
+                return index
+
+        with driver.session() as session:
+            query = "MATCH (p:Conceptual_System_Model {name: $item_name}) RETURN p.reachability_index AS index, p.reachability_version AS version"
+            stored = session.run(query, parameters={"item_name": item_name}).single()
+        driver.close()
+
+        if not stored or not stored["index"] or stored["version"] != version:
+            return self.build_reachability_index(item_name)
+
+        index = ReachabilityIndex.from_dict(json.loads(stored["index"]))
+        self.reachability_indexes[item_name] = (version, index)
+        return index
+
+    def generate_attack_relation_query(
+        self, rel_label, attack_label, forward=True, scope="all"
+    ):
+        # the source relations are matched per scope and the edges merged in
+        # batches with apoc.periodic.iterate
+        if scope == "item":
+            match = (
+                ITEM_NODES_QUERY
+                + "WITH node AS s MATCH (s)-[:"
+                + rel_label
+                + "]->(d:Item) RETURN s, d"
+            )
+        elif scope == "handles":
+            match = (
+                "UNWIND $handles AS h MATCH (s:Item {object_id: h})-[:"
                 + rel_label
-                + "]->(d:Item) MERGE (s)<-[r2:"
-                + attack_label
-                + "]-(d);"
+                + "]->(d:Item) RETURN s, d UNION UNWIND $handles AS h MATCH (s:Item)-[:"
+                + rel_label
+                + "]->(d:Item {object_id: h}) RETURN s, d"
             )
+        else:
+            match = "MATCH (s:Item)-[:" + rel_label + "]->(d:Item) RETURN s, d"
 
-        return {}, query
+        merge = "MERGE (s)-[:" + attack_label + "]->(d)"
+        if not forward:
+            merge = "MERGE (s)<-[:" + attack_label + "]-(d)"
 
-    def generate_node_query(self, node):
-        params = {
-            "name": node["name"],
-            "handle": node["handle"],
-            "description": node["description"],
+        query = "CALL apoc.periodic.iterate($match, $merge, {batchSize: $batch_size, params: $params})"
+
+        return {"match": match, "merge": merge}, query
+
+
+@cache
+class TARANeo4j:
+    """Versioned TARA results in the knowledge graph. Results use the layout
+    of tara.incremental.TaraStore: {step: {"rows": DataFrame, "inputs":
+    input row hashes}}."""
+
+    def __init__(self) -> None:
+        driver.verify_connectivity()
+        with driver.session() as session:
+            session.run(
+                "CREATE CONSTRAINT TARA_Run IF NOT EXISTS FOR (r:TARA_Run) REQUIRE (r.run_id) IS UNIQUE;"
+            )
+            session.run(
+                "CREATE CONSTRAINT TARA_Row IF NOT EXISTS FOR (r:TARA_Row) REQUIRE (r.hash) IS UNIQUE;"
+            )
+        driver.close()
+
+    def save_run(self, item_handle, tara_handle, results, batch_size=1000):
+        """Store the results as a new run of the item and return its version.
+        Raises ValueError if the item definition is not in the graph."""
+        columns = {}
+        rows = []
+        for step, result in results.items():
+            columns[step], data = serialize_rows(result["rows"])
+            for position, values in enumerate(data):
+                row = json.dumps(values, default=str)
+                rows.append(
+                    {
+                        "step": step,
+                        "position": position,
+                        "data": row,
+                        "hash": content_hash([step, columns[step], row]),
+                    }
+                )
+
+        run_id = str(uuid.uuid4())
+        with driver.session() as session:
+            created = session.run(
+                CREATE_TARA_RUN_QUERY,
+                parameters={
+                    "item_handle": item_handle,
+                    "tara_handle": tara_handle,
+                    "run_id": run_id,
+                    "columns": json.dumps(columns),
+                    "inputs": json.dumps(
+                        {step: result["inputs"] for step, result in results.items()}
+                    ),
+                },
+            ).single()
+            if created is None:
+                raise ValueError(f"item definition {item_handle} not found.")
+            version = created["version"]
+            for start in range(0, len(rows), batch_size):
+                session.run(
+                    INSERT_TARA_ROWS_QUERY,
+                    parameters={
+                        "run_id": run_id,
+                        "rows": rows[start : start + batch_size],
+                    },
+                )
+        driver.close()
+        return version
+
+    def load_run(self, item_handle, version=None):
+        """Return the version and results of a run (the latest by default),
+        or (None, {}) if the item has no stored runs."""
+        with driver.session() as session:
+            run = session.run(
+                LOAD_TARA_RUN_QUERY,
+                parameters={"item_handle": item_handle, "version": version},
+            ).single()
+        driver.close()
+        if run is None:
+            return None, {}
+
+        columns = json.loads(run["columns"])
+        inputs = json.loads(run["inputs"])
+        data = {step: [] for step in columns}
+        for step, _, row in run["rows"]:
+            data[step].append(json.loads(row))
+        return run["version"], {
+            step: {
+                "rows": pd.DataFrame(data[step], columns=columns[step]),
+                "inputs": inputs.get(step, {}),
+            }
+            for step in columns
         }
-        cypher_attrs = []
-        for attr in node["attributes"]:
-            attr_name = attr["name"].lower()
-            params[attr_name] = attr["value"]
-            cypher_attrs.append(f"i.{attr_name} = ${attr_name}")
 
-        params["embedding"] = ""  # self.embedding_model.embed_query(
-        #    "name: " + node["name"] + "\n" + "description: " + node["description"]
-        # )
+    def run_history(self, item_handle):
+        """Yield version, creation time and row count per step of every run."""
+        with driver.session() as session:
+            runs = session.run(
+                TARA_RUN_HISTORY_QUERY, parameters={"item_handle": item_handle}
+            )
+            for d in runs:
+                yield d
+        driver.close()
+
+    def diff_runs(self, item_handle, old_version, new_version):
+        """Rows added and removed per step between two runs of an item."""
+        _, old = self.load_run(item_handle, old_version)
+        _, new = self.load_run(item_handle, new_version)
+        diff = {}
+        for step in dict.fromkeys(list(old) + list(new)):
+            old_rows = old[step]["rows"] if step in old else pd.DataFrame()
+            new_rows = new[step]["rows"] if step in new else pd.DataFrame()
+            old_keys = row_strings(old_rows)
+            new_keys = row_strings(new_rows)
+            old_set, new_set = set(old_keys), set(new_keys)
+            diff[step] = {
+                "added": new_rows[[k not in old_set for k in new_keys]],
+                "removed": old_rows[[k not in new_set for k in old_keys]],
+            }
+        return diff
 
-        cypher_attr_str = ""
-        if cypher_attrs:
-            cypher_attr_str = ", " + ", ".join(cypher_attrs)
-        query = (
-            "MERGE (i:"
-            + node["type"]
-            + " {object_id: $handle}) ON CREATE SET i.name = $name, i.description = $description, i.embedding = $embedding"
-            + cypher_attr_str
-            + " RETURN i;"
-        )
 
-        return params, query
+def row_strings(rows):
+    return [json.dumps(row, default=str) for row in serialize_rows(rows)[1]]
 
 
 @cache
@@ -2,124 +2,19 @@ import requests
 import json
 import xmltodict
 import re
-from xml.etree.ElementTree import ElementTree
-import clr
-clr.AddReference("SystemWeaverClientAPI")
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from adapters.sw_metamodel import SWMetamodelIndex
 from functools import cache
-from SystemWeaverAPI import *
-from SystemWeaver.Common import *
 
-@cache
-class SWClient:
-    def __init__(self, server, port) -> None:
-        self.server = server
-        self.port = port
-
-    def authenticate(self, auth_data):       
-        
-        
-        SWConnection.Instance.LoginName = auth_data["username"]
-        SWConnection.Instance.Password = auth_data["password"]
-        SWConnection.Instance.ServerMachineName = self.server
-        SWConnection.Instance.ServerPort = self.port
-        SWConnection.Instance.AuthenticationMethod = AuthenticationMethod.NetworkAuthentication
-        
-        SWConnection.Instance.Login(getattr(EventSynchronization,'None'))
-        
-
-    def import_data(self, item_handle):
-        
-        if SWConnection.Instance.Connected:
-            handle = SWHandleUtility.ToHandle(item_handle)
-            item = SWConnection.Instance.Broker.GetItem(handle)
-            item_data = {"handle": item_handle}
-            items = {item_handle: item_data}
-            item_data["name"] = item.Name
-            item_data["description"] = SWDescription.DescriptionToPlainText(item.Description, item.Broker);
-            item_data["type"] = "Item:" + format_sw_type(item.swType.Name) 
-            item_data["attributes"] = []
-            for attr in item.Attributes:
-                attr_data = {}
-                attr_data["name"] = attr.AttributeType.Name.replace(" ", "_")
-                attr_data["value"] = attr.ValueAsString
-                item_data["attributes"].append(attr_data)
-            item_data["parts"] = {}
-            parts =  item.GetAllParts()
-            
-            for p in parts:
-                part = IswPart(p)
-                child_handle = part.DefObj.HandleStr
-
-                items.update(self.import_data(child_handle))
-                part_type = format_sw_type(part.swType.Name)
-
-                item_data["parts"][child_handle] = part_type
-          
-        return items
-    
-    def export_data(self, data):
-        
-        if SWConnection.Instance.Connected:
-            if "assets" in data:       
-                parent_item = self.__get_item_by_handle(data["item_handle"])         
-                for a in data["assets"].values():
-                    asset_item = self.__get_item_by_handle(a[0])                          
-                    self.__add_item(parent_item, asset_item, "SP0261")
-                if "damages" in data:                    
-                    for d in data["damages"]:
-                        damage_item = self.__create_item(parent_item, "Damage scenario for "+d[0], "SI0168","SP0270")
-                        asset_name = d[0]
-                        asset_item = self.__get_item_by_handle(data["assets"][asset_name])      
-                        self.__add_item(damage_item, asset_item, "SP0260")      
-                        for default_attr in damage_item.swItemType.GetAllDefaultAttributes():
-                            attrObj = IswDefaultAttribute(default_attr).AttrType
-                            if attrObj.DataType.ToString().lower() != "computed":
-                                dynType = self.__get_attrtype_by_handle(attrObj.HandleStr)
-                                attr = damage_item.GetOrMakeAttributeOfType(dynType)
-                                if attr.AttributeType.SID == "SA0054":#safety impact
-                                    attr.ValueAsString = d[2]
-                                elif attr.AttributeType.SID == "SA0055":# privacy impact
-                                    attr.ValueAsString = d[3]
-                                elif attr.AttributeType.SID == "SA0053":#finncial impact
-                                    attr.ValueAsString = d[4]
-                                elif attr.AttributeType.SID == "SA0052":# operational impact
-                                    attr.ValueAsString = d[5]
-                        for attr in damage_item.Attributes:                            
-                            if attr.AttributeType.SID == "SA0520":
-                                attr.ValueAsString = d[1]
-                            
-
-    def __get_attrtype_by_handle(self, attr_handle):
-        handle = SWHandleUtility.ToHandle(attr_handle)
-        return SWConnection.Instance.Broker.GetAttributeType(handle)
-    
-    def __get_item_by_handle(self, item_handle):
-        handle = SWHandleUtility.ToHandle(item_handle)
-        return SWConnection.Instance.Broker.GetItem(handle)
-    
-    def __add_item(self, p_item, item, part_SID):        
-        part_type = p_item.Broker.FindPartTypeWithSID(part_SID)
-        if part_type.Multiplicity == SWMultiplicity.Single:
-            p_item.SetPartObj(part_SID, item)
-        else:
-            p_item.AddPart(part_SID, item)
-                
-    def __create_item(self, p_item, item_name, item_SID, part_SID):
-        cyberLib = SWConnection.Instance.Broker.GetLibrary(SWHandleUtility.ToHandle("x1300000000000CDE"))                
-        item = cyberLib.CreateItem(item_SID, item_name)        
-        
-        part_type = p_item.Broker.FindPartTypeWithSID(part_SID)
-        if part_type.Multiplicity == SWMultiplicity.Single:
-            p_item.SetPartObj(part_SID, item)
-        else:
-            p_item.AddPart(part_SID, item)
-        return item
+# SWClient, which needs the SystemWeaver client API DLL, is in sw_client.py
 
 @cache
 class SWREST:
     def __init__(self, server, port) -> None:
         self.server = server
         self.port = port
+        self.type_labels = {}
 
     def authenticate(self, auth_data):
         auth_response = requests.post(
@@ -128,7 +23,10 @@ class SWREST:
         
         self.auth_token = auth_response["access_token"]
 
-    def import_data(self, item_handle):
+    def import_data(self, item_handles, max_workers=8, on_progress=None):
+        return crawl_items(self.fetch_item, item_handles, max_workers, on_progress)
+
+    def fetch_item(self, item_handle):
 
         headers = {"Authorization": "Bearer " + self.auth_token}
         input_data = requests.get(
@@ -139,22 +37,12 @@ class SWREST:
             raise Exception("item with the specified handle not found.")
         item_data = {"handle": item_handle}
 
-        items = {item_handle: item_data}
-
         item_data["name"] = input_data["name"]
         item_data["description"] = requests.get(
             f"http://{self.server}:{self.port}/restapi/descriptions/" + item_handle,
             headers=headers,
         ).json()["description"]
-        item_data["type"] = "Item:" + format_sw_type(input_data["type"]["name"])
-        # item_types = [input_data["type"]["name"]]
-
-        # item_types.extend(self.__get_type_hierrchy(input_data["type"]["sid"]))
-
-        # item_data["type"] = ":".join(
-        #    [format_sw_type(item_type) for item_type in item_types]
-        # )
-        # print(item_data["type"])
+        item_data["type"] = self.get_type_label(input_data["type"])
         # embedding_text = (
         #    f"handle: {item_handle}\nname:{item_data['name']}\ntype:{item_data['type']}\n"
         # )
@@ -168,8 +56,6 @@ class SWREST:
         item_data["parts"] = {}
         for part in input_data["parts"]:
             child_handle = part["defObject"]["handle"]
-
-            items.update(self.import_data(child_handle))
             part_type = format_sw_type(part["type"]["name"])
 
             item_data["parts"][child_handle] = part_type
@@ -177,40 +63,63 @@ class SWREST:
 
         # item_data['embedding'] = embeddings.embed_query(embedding_text)
 
-        return items
-
-    def __get_type_hierrchy(self, type_sid):
-
-        type_list = []
-
-        if self.item_types and type_sid in self.item_types:
-
-            cur_sid = type_sid
-            while True:
-
-                cur_sid = self.item_types[cur_sid]["parent"]
-                if cur_sid and cur_sid in self.item_types:
-                    cur_type = self.item_types[cur_sid]["name"]
-
-                    type_list.append(cur_type)
-                else:
-                    break
-
-        return type_list
+        return item_data
 
     def get_item_types(self, metamodel):
-
-        tree = ElementTree()
-        tree.parse(metamodel)
-        root = tree.getroot()
-        types_element = root[1][0][1]
-        self.item_types = {}
-        if types_element.tag == "ItemTypes":
-            for type_element in types_element:
-                name = type_element[0].text
-                sid = type_element.attrib["sid"]
-                parent = type_element.attrib["parent"]
-                self.item_types[sid] = {"name": name, "parent": parent}
+        self.type_labels = SWMetamodelIndex.load(metamodel).labels(format_sw_type)
+
+    def get_type_label(self, sw_type):
+        if sw_type["sid"] in self.type_labels:
+            return self.type_labels[sw_type["sid"]]
+        return "Item:" + format_sw_type(sw_type["name"])
+
+
+def crawl_items(fetch_item, item_handles, max_workers=8, on_progress=None):
+    """Fetch the item trees below one or more root handles.
+
+    Items are fetched by a pool of workers and every handle is requested only
+    once, so definition objects shared between roots (or reached twice within
+    one root) are not fetched again. on_progress is called in the caller's
+    thread with the number of items fetched per root and the number of
+    pending requests.
+    """
+    if isinstance(item_handles, str):
+        item_handles = [item_handles]
+
+    items = {}
+    root_counts = {handle: 0 for handle in item_handles}
+    # discovered handles wait in a queue, so that only a bounded number of
+    # futures is in flight and every wait stays cheap
+    queued = deque()
+    for handle in root_counts:
+        items[handle] = None
+        queued.append((handle, handle))
+    max_in_flight = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        try:
+            while queued or in_flight:
+                while queued and len(in_flight) < max_in_flight:
+                    handle, root = queued.popleft()
+                    in_flight[executor.submit(fetch_item, handle)] = root
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    root = in_flight.pop(future)
+                    item_data = future.result()
+                    items[item_data["handle"]] = item_data
+                    root_counts[root] += 1
+                    for child_handle in item_data["parts"]:
+                        if child_handle not in items:
+                            items[child_handle] = None
+                            queued.append((child_handle, root))
+                if on_progress:
+                    on_progress(root_counts, len(in_flight) + len(queued))
+        except Exception:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    return items
 
 
 def format_sw_type(sw_type):
@@ -234,4 +143,4 @@ def dump_json(items):
     file_name = "data.json"
 
     with open(file_name, "w") as json_file:
-        json.dump(items.values(), json_file)
+        json.dump(list(items.values()), json_file)
@@ -0,0 +1,124 @@
+import clr
+clr.AddReference("SystemWeaverClientAPI")
+from functools import cache
+from SystemWeaverAPI import *
+from SystemWeaver.Common import *
+from adapters.sw_adapter import crawl_items, format_sw_type
+from adapters.sw_metamodel import SWMetamodelIndex
+
+@cache
+class SWClient:
+    def __init__(self, server, port) -> None:
+        self.server = server
+        self.port = port
+        self.type_labels = {}
+
+    def authenticate(self, auth_data):       
+        
+        
+        SWConnection.Instance.LoginName = auth_data["username"]
+        SWConnection.Instance.Password = auth_data["password"]
+        SWConnection.Instance.ServerMachineName = self.server
+        SWConnection.Instance.ServerPort = self.port
+        SWConnection.Instance.AuthenticationMethod = AuthenticationMethod.NetworkAuthentication
+        
+        SWConnection.Instance.Login(getattr(EventSynchronization,'None'))
+        
+
+    def import_data(self, item_handles, max_workers=1, on_progress=None):
+        # the client API shares one broker connection, so crawl sequentially
+        # unless the caller explicitly asks for more workers
+        if not SWConnection.Instance.Connected:
+            return {}
+        return crawl_items(self.fetch_item, item_handles, max_workers, on_progress)
+
+    def fetch_item(self, item_handle):
+        handle = SWHandleUtility.ToHandle(item_handle)
+        item = SWConnection.Instance.Broker.GetItem(handle)
+        item_data = {"handle": item_handle}
+        item_data["name"] = item.Name
+        item_data["description"] = SWDescription.DescriptionToPlainText(item.Description, item.Broker);
+        item_data["type"] = self.get_type_label(item.swType)
+        item_data["attributes"] = []
+        for attr in item.Attributes:
+            attr_data = {}
+            attr_data["name"] = attr.AttributeType.Name.replace(" ", "_")
+            attr_data["value"] = attr.ValueAsString
+            item_data["attributes"].append(attr_data)
+        item_data["parts"] = {}
+        parts =  item.GetAllParts()
+        
+        for p in parts:
+            part = IswPart(p)
+            child_handle = part.DefObj.HandleStr
+            part_type = format_sw_type(part.swType.Name)
+
+            item_data["parts"][child_handle] = part_type
+
+        return item_data
+    
+    def export_data(self, data):
+        
+        if SWConnection.Instance.Connected:
+            if "assets" in data:       
+                parent_item = self.__get_item_by_handle(data["item_handle"])         
+                for a in data["assets"].values():
+                    asset_item = self.__get_item_by_handle(a[0])                          
+                    self.__add_item(parent_item, asset_item, "SP0261")
+                if "damages" in data:                    
+                    for d in data["damages"]:
+                        damage_item = self.__create_item(parent_item, "Damage scenario for "+d[0], "SI0168","SP0270")
+                        asset_name = d[0]
+                        asset_item = self.__get_item_by_handle(data["assets"][asset_name])      
+                        self.__add_item(damage_item, asset_item, "SP0260")      
+                        for default_attr in damage_item.swItemType.GetAllDefaultAttributes():
+                            attrObj = IswDefaultAttribute(default_attr).AttrType
+                            if attrObj.DataType.ToString().lower() != "computed":
+                                dynType = self.__get_attrtype_by_handle(attrObj.HandleStr)
+                                attr = damage_item.GetOrMakeAttributeOfType(dynType)
+                                if attr.AttributeType.SID == "SA0054":#safety impact
+                                    attr.ValueAsString = d[2]
+                                elif attr.AttributeType.SID == "SA0055":# privacy impact
+                                    attr.ValueAsString = d[3]
+                                elif attr.AttributeType.SID == "SA0053":#finncial impact
+                                    attr.ValueAsString = d[4]
+                                elif attr.AttributeType.SID == "SA0052":# operational impact
+                                    attr.ValueAsString = d[5]
+                        for attr in damage_item.Attributes:                            
+                            if attr.AttributeType.SID == "SA0520":
+                                attr.ValueAsString = d[1]
+                            
+
+    def get_item_types(self, metamodel):
+        self.type_labels = SWMetamodelIndex.load(metamodel).labels(format_sw_type)
+
+    def get_type_label(self, sw_type):
+        if sw_type.SID in self.type_labels:
+            return self.type_labels[sw_type.SID]
+        return "Item:" + format_sw_type(sw_type.Name)
+
+    def __get_attrtype_by_handle(self, attr_handle):
+        handle = SWHandleUtility.ToHandle(attr_handle)
+        return SWConnection.Instance.Broker.GetAttributeType(handle)
+    
+    def __get_item_by_handle(self, item_handle):
+        handle = SWHandleUtility.ToHandle(item_handle)
+        return SWConnection.Instance.Broker.GetItem(handle)
+    
+    def __add_item(self, p_item, item, part_SID):        
+        part_type = p_item.Broker.FindPartTypeWithSID(part_SID)
+        if part_type.Multiplicity == SWMultiplicity.Single:
+            p_item.SetPartObj(part_SID, item)
+        else:
+            p_item.AddPart(part_SID, item)
+                
+    def __create_item(self, p_item, item_name, item_SID, part_SID):
+        cyberLib = SWConnection.Instance.Broker.GetLibrary(SWHandleUtility.ToHandle("x1300000000000CDE"))                
+        item = cyberLib.CreateItem(item_SID, item_name)        
+        
+        part_type = p_item.Broker.FindPartTypeWithSID(part_SID)
+        if part_type.Multiplicity == SWMultiplicity.Single:
+            p_item.SetPartObj(part_SID, item)
+        else:
+            p_item.AddPart(part_SID, item)
+        return item
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from xml.etree.ElementTree import iterparse
+
+CACHE_DIR = "./metamodel_cache"
+
+
+class SWMetamodelIndex:
+    """Item-type hierarchy of a SystemWeaver metamodel.
+
+    Every type SID gets a compact integer id and its full ancestor chain
+    (the type itself first, the root type last) is computed once, so looking up
+    the labels of an item is a single dictionary access.
+    """
+
+    def __init__(self, sids, names, parents) -> None:
+        self.sids = sids
+        self.names = names
+        self.parents = parents
+        self.ids = {sid: ind for ind, sid in enumerate(sids)}
+        self.ancestors = [self.__ancestor_chain(ind) for ind in range(len(sids))]
+        self.type_labels = {}
+
+    def __ancestor_chain(self, type_id):
+        chain = []
+        while type_id >= 0 and type_id not in chain:
+            chain.append(type_id)
+            type_id = self.parents[type_id]
+        return chain
+
+    def type_id(self, sid):
+        return self.ids.get(sid)
+
+    def type_hierarchy(self, sid):
+        if sid not in self.ids:
+            return []
+        return [self.names[ind] for ind in self.ancestors[self.ids[sid]]]
+
+    def labels(self, format_type):
+        """Precompute the multi-label string, e.g. Item:Component:Hardware,
+        of every type using the given label formatter."""
+        self.type_labels = {}
+        for sid, type_id in self.ids.items():
+            labels = ["Item"]
+            for ind in self.ancestors[type_id]:
+                label = format_type(self.names[ind])
+                if label and label not in labels:
+                    labels.append(label)
+            self.type_labels[sid] = ":".join(labels)
+        return self.type_labels
+
+    def save(self, file_name):
+        with open(file_name, "w", encoding="utf-8") as index_file:
+            json.dump(
+                {"sids": self.sids, "names": self.names, "parents": self.parents},
+                index_file,
+            )
+
+    @classmethod
+    def read(cls, file_name):
+        with open(file_name, encoding="utf-8") as index_file:
+            data = json.load(index_file)
+        return cls(data["sids"], data["names"], data["parents"])
+
+    @classmethod
+    def parse(cls, metamodel):
+        """Stream the ItemTypes section of a metamodel XML file with iterparse,
+        discarding every other element as soon as it has been read. Only the
+        section directly below the root counts, and entries without a sid
+        are skipped."""
+        types = {}
+        depth = 0
+        types_depth = None
+
+        for event, element in iterparse(metamodel, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if element.tag == "ItemTypes" and depth == 2:
+                    types_depth = depth
+                continue
+
+            if types_depth is not None and depth == types_depth + 1:
+                if "sid" in element.attrib:
+                    name = element[0].text if len(element) else None
+                    types[element.attrib["sid"]] = (name, element.attrib.get("parent"))
+                element.clear()
+            elif types_depth is None or depth <= types_depth:
+                if depth == types_depth:
+                    types_depth = None
+                element.clear()
+            depth -= 1
+
+        sids = list(types)
+        ids = {sid: ind for ind, sid in enumerate(sids)}
+        names = [types[sid][0] for sid in sids]
+        parents = [ids.get(types[sid][1], -1) for sid in sids]
+
+        return cls(sids, names, parents)
+
+    @classmethod
+    def load(cls, metamodel, cache_dir=CACHE_DIR):
+        """Return the index of a metamodel file (path or binary file object),
+        reusing the copy saved on disk for the same metamodel content."""
+        digest = hashlib.sha256()
+        if hasattr(metamodel, "read"):
+            for block in iter(lambda: metamodel.read(1 << 20), b""):
+                digest.update(block)
+            metamodel.seek(0)
+        else:
+            with open(metamodel, "rb") as metamodel_file:
+                for block in iter(lambda: metamodel_file.read(1 << 20), b""):
+                    digest.update(block)
+
+        file_name = os.path.join(cache_dir, digest.hexdigest() + ".json")
+        if os.path.exists(file_name):
+            return cls.read(file_name)
+
+        index = cls.parse(metamodel)
+        os.makedirs(cache_dir, exist_ok=True)
+        index.save(file_name)
+        return index
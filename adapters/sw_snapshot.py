@@ -0,0 +1,165 @@
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# A snapshot is a directory holding three tables, either as Parquet or as
+# line-delimited JSON: one row per item, one row per attribute and one row per
+# part edge. Attribute values are JSON-encoded in Parquet so mixed value types
+# survive the round trip.
+TABLES = {
+    "items": pa.schema(
+        [
+            ("handle", pa.string()),
+            ("name", pa.string()),
+            ("description", pa.string()),
+            ("type", pa.string()),
+        ]
+    ),
+    "attributes": pa.schema(
+        [
+            ("handle", pa.string()),
+            ("name", pa.string()),
+            ("value", pa.string()),
+        ]
+    ),
+    "parts": pa.schema(
+        [
+            ("handle", pa.string()),
+            ("part_handle", pa.string()),
+            ("part_type", pa.string()),
+        ]
+    ),
+}
+
+FORMATS = {"parquet": ".parquet", "jsonl": ".jsonl"}
+
+
+class SnapshotWriter:
+    def __init__(self, path, format="parquet", batch_size=10000) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"unsupported snapshot format: {format}")
+        self.path = path
+        self.format = format
+        self.batch_size = batch_size
+        self.item_count = 0
+        os.makedirs(path, exist_ok=True)
+
+        self.buffers = {table: [] for table in TABLES}
+        self.writers = {}
+        for table, schema in TABLES.items():
+            file_name = os.path.join(path, table + FORMATS[format])
+            if format == "parquet":
+                self.writers[table] = pq.ParquetWriter(file_name, schema)
+            else:
+                self.writers[table] = open(file_name, "w", encoding="utf-8")
+
+    def write(self, items):
+        """Append items to the snapshot. Accepts the {handle: item_data}
+        dictionary returned by import_data or any iterable of item_data."""
+        if isinstance(items, dict):
+            items = items.values()
+
+        for item in items:
+            handle = item["handle"]
+            self.buffers["items"].append(
+                {
+                    "handle": handle,
+                    "name": item["name"],
+                    "description": item["description"],
+                    "type": item["type"],
+                }
+            )
+            for attr in item["attributes"] or []:
+                self.buffers["attributes"].append(
+                    {"handle": handle, "name": attr["name"], "value": attr["value"]}
+                )
+            for part_handle, part_type in (item["parts"] or {}).items():
+                self.buffers["parts"].append(
+                    {
+                        "handle": handle,
+                        "part_handle": part_handle,
+                        "part_type": part_type,
+                    }
+                )
+            self.item_count += 1
+
+            if len(self.buffers["items"]) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        for table, rows in self.buffers.items():
+            if not rows:
+                continue
+            if self.format == "parquet":
+                if table == "attributes":
+                    rows = [dict(row, value=json.dumps(row["value"])) for row in rows]
+                self.writers[table].write_table(
+                    pa.Table.from_pylist(rows, schema=TABLES[table])
+                )
+            else:
+                self.writers[table].writelines(
+                    json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+                )
+            self.buffers[table] = []
+
+    def close(self):
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_snapshot(items, path, format="parquet", batch_size=10000):
+    with SnapshotWriter(path, format=format, batch_size=batch_size) as writer:
+        writer.write(items)
+    return writer.item_count
+
+
+def snapshot_format(path):
+    for format, extension in FORMATS.items():
+        if os.path.exists(os.path.join(path, "items" + extension)):
+            return format
+    raise FileNotFoundError(f"no snapshot found in {path}")
+
+
+def read_table(path, table, format=None):
+    """Yield the rows of one snapshot table as dictionaries."""
+    format = format or snapshot_format(path)
+    file_name = os.path.join(path, table + FORMATS[format])
+
+    if format == "parquet":
+        for batch in pq.ParquetFile(file_name).iter_batches():
+            columns = batch.to_pydict()
+            if table == "attributes":
+                columns["value"] = [json.loads(v) for v in columns["value"]]
+            yield from (dict(zip(columns, row)) for row in zip(*columns.values()))
+    else:
+        with open(file_name, encoding="utf-8") as table_file:
+            for line in table_file:
+                yield json.loads(line)
+
+
+def read_snapshot(path):
+    """Rebuild the {handle: item_data} dictionary stored in a snapshot so that
+    it can be passed straight to SWNeo4j.insert_data."""
+    format = snapshot_format(path)
+
+    items = {}
+    for row in read_table(path, "items", format):
+        row["attributes"] = []
+        row["parts"] = {}
+        items[row["handle"]] = row
+    for row in read_table(path, "attributes", format):
+        items[row["handle"]]["attributes"].append(
+            {"name": row["name"], "value": row["value"]}
+        )
+    for row in read_table(path, "parts", format):
+        items[row["handle"]]["parts"][row["part_handle"]] = row["part_type"]
+
+    return items
@@ -1,7 +1,10 @@
+import queue
+import threading
 from fastapi import FastAPI, Query
+from fastapi.responses import StreamingResponse
 from pydantic import Field, BaseModel
 from llm.tara_agent import TaraAgent
-import ast
+from tara import frames
 from typing import Dict, Annotated
 
 
@@ -80,6 +83,8 @@ class Asset(BaseModel):
 class AssetIdentification(BaseModel):
     SystemModel: SystemModel
     Assets: list[Asset]
+    # handles of the elements the analysis failed on
+    Failed: list[str] = []
 
 
 app = FastAPI(debug=True)
@@ -92,8 +97,7 @@ def post_item(input_data: ItemDefinition):
     return {}
 
 
-@app.get("/asset_identification", response_model=AssetIdentification)
-def get_assets():
+def asset_inputs():
     items = [
         item
         for item in app.item_def.Items
@@ -102,34 +106,69 @@ def get_assets():
     security_properties = [
         p for p, v in app.item_def.Parameters.SecurityProperties if v == True
     ]
-    elements = [{"name": d.Name, "description": d.Description.Text} for d in items]
+    elements = [
+        {"element_name": d.Name, "element_description": d.Description.Text}
+        for d in items
+    ]
+    return items, elements, security_properties
+
+
+def to_assets(elements, handles, security_properties):
+    assets = frames.asset_frame(elements, security_properties)
+    return [
+        Asset(
+            Handle=handle,
+            Name=row["Element Name"],
+            IsAsset=row["Is Asset"],
+            Properties={p: row[p] for p in security_properties},
+            Rationale=row["Rationale"],
+        )
+        for handle, row in zip(handles, assets.to_dict("records"))
+    ]
+
+
+@app.get("/asset_identification", response_model=AssetIdentification)
+def get_assets():
+    items, elements, security_properties = asset_inputs()
 
     tara_agent = TaraAgent()
-    llm_feedback_str = tara_agent.generate_response(
-        f"Identify assets whithin the following list of elements {elements} considering {security_properties} as security properties"
-    )
-    llm_feedback = ast.literal_eval(llm_feedback_str)["elements"]
+    results, failed = tara_agent.identify_assets(elements, [], security_properties)
 
+    handles = {item.Name: item.Handle for item in items}
     output_data = AssetIdentification(
-        SystemModel=SystemModel(Handle=app.item_def.Items[0].Handle), Assets=[]
+        SystemModel=SystemModel(Handle=app.item_def.Items[0].Handle),
+        Assets=to_assets(
+            results.elements,
+            [handles.get(el.name, "") for el in results.elements],
+            security_properties,
+        ),
+        Failed=[handles.get(el["element_name"], "") for el in failed],
     )
 
-    for ind, el in enumerate(llm_feedback):
-        asset = Asset(
-            Handle=app.item_def.Items[ind + 1].Handle,
-            Name=el["name"],
-            IsAsset=el["is_asset"],
-            Properties=dict(),
-            Rationale="",
-        )
+    return output_data
 
-        reason_str = "Asset: " + el["asset_reason"]
-        for p in security_properties:
-            p_l = p.lower().replace("-", "_")
-            asset.Properties[p] = el[p_l]
-            reason_str += "\n" + p + ": " + el[p_l + "_reason"]
-        asset.Rationale = reason_str
 
-        output_data.Assets.append(asset)
+@app.get("/asset_identification/stream")
+def stream_assets():
+    """Assets as newline-delimited JSON, each one as soon as it has been
+    identified."""
+    items, elements, security_properties = asset_inputs()
+    handles = {item.Name: item.Handle for item in items}
+    streamed = queue.Queue()
 
-    return output_data
+    def identify():
+        try:
+            TaraAgent().identify_assets(
+                elements, [], security_properties, on_item=streamed.put
+            )
+        finally:
+            streamed.put(None)
+
+    threading.Thread(target=identify, daemon=True).start()
+
+    def assets():
+        while (el := streamed.get()) is not None:
+            asset = to_assets([el], [handles.get(el.name, "")], security_properties)[0]
+            yield asset.model_dump_json() + "\n"
+
+    return StreamingResponse(assets(), media_type="application/x-ndjson")
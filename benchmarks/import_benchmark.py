@@ -0,0 +1,91 @@
+import argparse
+import json
+import threading
+import time
+import uvicorn
+from benchmarks.sw_rest_server import create_app, generate_items
+from adapters.sw_adapter import SWREST
+
+# Measures SWREST.import_data (and optionally SWNeo4j.insert_data) against the
+# local stand-in server, e.g.
+#   python -m benchmarks.import_benchmark --sizes 1000 10000 100000 --workers 1 8 32
+
+
+def serve(app, host, port):
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def run(args):
+    results = []
+    for size in args.sizes:
+        items, descriptions = generate_items(
+            size, args.fan_out, args.depth, args.shared, args.seed
+        )
+        root = next(iter(items))
+        app = create_app(items, descriptions, args.latency, args.jitter)
+        server, thread = serve(app, args.host, args.port)
+
+        try:
+            sw_endpoint = SWREST(args.host, args.port)
+            sw_endpoint.authenticate({})
+            for workers in args.workers:
+                app.request_count = 0
+                start = time.perf_counter()
+                sw_items = sw_endpoint.import_data(root, max_workers=workers)
+                elapsed = time.perf_counter() - start
+                result = {
+                    "items": len(sw_items),
+                    "workers": workers,
+                    "latency": args.latency,
+                    "requests": app.request_count,
+                    "import_seconds": round(elapsed, 3),
+                    "items_per_second": round(len(sw_items) / elapsed, 1),
+                }
+
+                if args.neo4j:
+                    from adapters.neo4j_adapter import SWNeo4j
+
+                    start = time.perf_counter()
+                    SWNeo4j().insert_data(sw_items)
+                    result["insert_seconds"] = round(time.perf_counter() - start, 3)
+
+                print(json.dumps(result))
+                results.append(result)
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SystemWeaver import benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--shared", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8077)
+    parser.add_argument("--neo4j", action="store_true", help="also time insert_data")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import statistics
+import time
+from llm import chains
+from tara.chunking import count_tokens
+from utils import load_llm
+
+# Compares time-to-first-token of the TARA step prompts with the variable
+# input first (the old layout) and last (static prefix first) over repeated
+# fan-out calls with different inputs, against the LLM configured in
+# .streamlit/secrets.toml, e.g.
+#   python -m benchmarks.prompt_benchmark --calls 10 --json-mode
+
+PROMPTS = {
+    "threats": chains.threat_prompt,
+    "damages": chains.damage_prompt,
+    "attack_paths": chains.attack_path_prompt,
+    "goals": chains.goal_prompt,
+}
+
+
+def fan_out_inputs(calls, rows):
+    """CSV inputs like those FanOutChain sends, different in every call."""
+    return [
+        "Asset Name,Threat Scenario,Affected Properties\n"
+        + "".join(
+            f"Asset {call}-{row},Spoofing of message {call}-{row} on the CAN bus,Integrity\n"
+            for row in range(rows)
+        )
+        for call in range(calls)
+    ]
+
+
+def layouts(chat_prompt):
+    """The same prompt text with the input first and last."""
+    before, after = chat_prompt.format(input="\0").split("\0")
+    return {
+        "input_first": lambda user_input: user_input + before + after,
+        "prefix_first": lambda user_input: before + user_input + after,
+    }
+
+
+def time_to_first_token(llm, prompt):
+    start = time.perf_counter()
+    for _ in llm.stream(prompt):
+        # closing the stream stops the generation
+        return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def run(args):
+    llm = load_llm(json_mode=args.json_mode)
+    inputs = fan_out_inputs(args.calls, args.rows)
+    results = []
+    for chain, prompt in PROMPTS.items():
+        if args.chains and chain not in args.chains:
+            continue
+        chat_prompt, _ = prompt(args.json_mode)
+        for layout, build in layouts(chat_prompt).items():
+            ttft = [time_to_first_token(llm, build(i)) for i in inputs]
+            result = {
+                "chain": chain,
+                "layout": layout,
+                "json_mode": args.json_mode,
+                "calls": args.calls,
+                "prefix_tokens": count_tokens(chat_prompt.format(input="")),
+                "verbose_prefix_tokens": count_tokens(prompt()[0].format(input="")),
+                "prompt_tokens": statistics.mean(count_tokens(build(i)) for i in inputs),
+                "first_ttft_seconds": round(ttft[0], 3),
+                "repeat_ttft_seconds": round(statistics.median(ttft[1:] or ttft), 3),
+            }
+            print(json.dumps(result))
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TARA prompt layout benchmark")
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=3, help="threats per call")
+    parser.add_argument("--chains", nargs="+", choices=list(PROMPTS))
+    parser.add_argument(
+        "--json-mode", action="store_true", help="JSON-constrained, compact schema"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import random
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from adapters.sw_snapshot import read_snapshot
+
+# Stand-in for the SystemWeaver REST API serving the three endpoints SWREST
+# uses. Item trees are either generated synthetically or replayed from a
+# snapshot written by adapters.sw_snapshot.
+
+COMPONENT_ATTRIBUTES = {
+    "Controller": ["Controller", "Input / Sensor", "Output / Actuator"],
+    "Hardware": ["Hardware", "Software", "Mixed"],
+}
+
+
+def rest_item(handle, name, type_name, type_sid, attributes, parts):
+    return {
+        "handle": handle,
+        "name": name,
+        "type": {"name": type_name, "sid": type_sid},
+        "attributes": [
+            {"attributeType": {"name": attr_name}, "value": value}
+            for attr_name, value in attributes
+        ],
+        "parts": [
+            {
+                "defObject": {"handle": part_handle, "name": part_name},
+                "type": {"name": part_type},
+            }
+            for part_handle, part_name, part_type in parts
+        ],
+    }
+
+
+def generate_items(size, fan_out=8, depth=6, shared=0.0, seed=0):
+    """Generate a tree of at most size items, breadth first, with up to
+    fan_out parts per item and depth levels below the root. A share of the
+    parts point at already generated definition objects instead of new ones."""
+    rnd = random.Random(seed)
+    handles = ["x04%013X" % ind for ind in range(size)]
+    names = {}
+    levels = {handles[0]: 0}
+    parts = {handles[0]: []}
+    next_ind = 1
+
+    for handle in handles:
+        if handle not in levels:
+            break
+        if levels[handle] >= depth:
+            continue
+        for _ in range(fan_out):
+            if next_ind > 1 and rnd.random() < shared:
+                child = handles[rnd.randrange(1, next_ind)]
+                if child == handle:
+                    continue
+            elif next_ind < size:
+                child = handles[next_ind]
+                next_ind += 1
+                levels[child] = levels[handle] + 1
+                parts[child] = []
+            else:
+                break
+            parts[handle].append(child)
+
+    items = {}
+    descriptions = {}
+    for ind, handle in enumerate(levels):
+        names[handle] = "Conceptual architecture" if ind == 0 else f"Component {ind}"
+    for ind, handle in enumerate(levels):
+        if ind == 0:
+            type_name, type_sid, attributes = "Conceptual Architecture", "SI0227", []
+        else:
+            type_name, type_sid = "Conceptual System/Component", "SI0228"
+            attributes = [
+                (attr_name, rnd.choice(values))
+                for attr_name, values in COMPONENT_ATTRIBUTES.items()
+            ]
+        items[handle] = rest_item(
+            handle,
+            names[handle],
+            type_name,
+            type_sid,
+            attributes,
+            [
+                (child, names[child], "Included System/Component(s)")
+                for child in parts[handle]
+            ],
+        )
+        descriptions[handle] = f"Description of {names[handle]}."
+
+    return items, descriptions
+
+
+def recorded_items(snapshot_path):
+    """Convert a snapshot back into REST API responses."""
+    snapshot = read_snapshot(snapshot_path)
+
+    items = {}
+    descriptions = {}
+    for handle, item_data in snapshot.items():
+        type_name = item_data["type"].split(":")[-1].replace("_", " ")
+        items[handle] = rest_item(
+            handle,
+            item_data["name"],
+            type_name,
+            type_name,
+            [(attr["name"], attr["value"]) for attr in item_data["attributes"]],
+            [
+                (part_handle, snapshot[part_handle]["name"], part_type)
+                for part_handle, part_type in item_data["parts"].items()
+                if part_handle in snapshot
+            ],
+        )
+        descriptions[handle] = item_data["description"]
+
+    return items, descriptions
+
+
+def create_app(items, descriptions, latency=0.0, jitter=0.0):
+    app = FastAPI()
+    app.request_count = 0
+
+    async def delay():
+        app.request_count += 1
+        if latency or jitter:
+            await asyncio.sleep(latency + random.uniform(0, jitter))
+
+    @app.post("/token")
+    async def token():
+        await delay()
+        return {"access_token": "replay", "token_type": "bearer"}
+
+    @app.get("/restapi/items/{handle}")
+    async def get_item(handle: str):
+        await delay()
+        if handle not in items:
+            return JSONResponse(
+                {"exceptionType": "ItemNotFound", "message": handle}, status_code=404
+            )
+        return items[handle]
+
+    @app.get("/restapi/descriptions/{handle}")
+    async def get_description(handle: str):
+        await delay()
+        return {"description": descriptions.get(handle, "")}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SystemWeaver REST stand-in")
+    parser.add_argument("--snapshot", help="replay a recorded snapshot directory")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--shared", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8077)
+    args = parser.parse_args()
+
+    if args.snapshot:
+        items, descriptions = recorded_items(args.snapshot)
+    else:
+        items, descriptions = generate_items(
+            args.items, args.fan_out, args.depth, args.shared, args.seed
+        )
+    print(f"serving {len(items)} items, root {next(iter(items))}")
+    uvicorn.run(
+        create_app(items, descriptions, args.latency, args.jitter),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import random
+
+# Generates TARA-ready system models in the {handle: item_data} shape produced
+# by SWREST.import_data, so they can be written with SWNeo4j.insert_data and
+# queried with the same adapter methods as imported SystemWeaver data.
+
+SECURITY_PROPERTIES = [
+    "Confidentiality",
+    "Integrity",
+    "Availability",
+    "Authenticity",
+    "Non-repudiation",
+]
+COMPONENT_KINDS = ["ECU", "Gateway", "Sensor", "Actuator", "Controller", "Connector"]
+MEDIUM_KINDS = ["CAN bus", "Automotive Ethernet", "LIN bus", "FlexRay", "Bluetooth"]
+INFORMATION_KINDS = ["Firmware", "Calibration data", "Keys", "Logs", "Configuration"]
+
+
+def item(handle, name, item_type, description="", attributes=None, parts=None):
+    return {
+        "handle": handle,
+        "name": name,
+        "description": description,
+        "type": "Item:" + item_type,
+        "attributes": attributes or [],
+        "parts": parts or {},
+    }
+
+
+def generate_system_model(
+    size,
+    models=1,
+    subcomponents=3,
+    stored_information=1,
+    interfaces=2,
+    components_per_medium=8,
+    seed=0,
+    prefix="bench",
+):
+    """Generate about size items spread over the given number of
+    Conceptual_System_Model items, each with its own TARA and security
+    property catalogue.
+
+    Every component gets the given number of subcomponents, stored
+    information items and outgoing Input/Output interfaces to other
+    components of the same model, and shares a communication medium with
+    components_per_medium other components.
+    """
+    rnd = random.Random(seed)
+    items = {}
+    per_component = 1 + subcomponents + stored_information + 1 / components_per_medium
+    components = max(2, int(size / models / per_component))
+
+    for model_ind in range(models):
+        model_prefix = f"{prefix}-{model_ind}"
+        model_name = f"System model {model_ind}"
+        model = item(f"{model_prefix}-model", model_name, "Conceptual_System_Model")
+        catalog = item(
+            f"{model_prefix}-catalog",
+            f"Security properties {model_ind}",
+            "Security_Property_Catalog",
+        )
+        tara = item(
+            f"{model_prefix}-tara",
+            f"TARA {model_ind}",
+            "TARA",
+            parts={
+                model["handle"]: "Security_Item_Definition",
+                catalog["handle"]: "Security_Property_List",
+            },
+        )
+        items.update({i["handle"]: i for i in (model, catalog, tara)})
+        for prop in SECURITY_PROPERTIES:
+            prop_item = item(f"{model_prefix}-{prop.lower()}", prop, "Security_Property")
+            items[prop_item["handle"]] = prop_item
+            catalog["parts"][prop_item["handle"]] = "Security_Property"
+
+        component_handles = []
+        medium_handle = None
+        for comp_ind in range(components):
+            kind = rnd.choice(COMPONENT_KINDS)
+            component = item(
+                f"{model_prefix}-c{comp_ind}",
+                f"{kind} {model_ind}.{comp_ind}",
+                "Conceptual_System_or_Component",
+                f"{kind} number {comp_ind} of system model {model_ind}.",
+                [
+                    {"name": "Hardware", "value": rnd.choice(["Hardware", "Software", "Mixed"])},
+                ],
+            )
+            items[component["handle"]] = component
+            model["parts"][component["handle"]] = "System_Component"
+            component_handles.append(component["handle"])
+
+            for sub_ind in range(subcomponents):
+                sub = item(
+                    f"{component['handle']}-s{sub_ind}",
+                    f"{component['name']} part {sub_ind}",
+                    "Conceptual_System_or_Component",
+                    f"Subcomponent {sub_ind} of {component['name']}.",
+                )
+                items[sub["handle"]] = sub
+                component["parts"][sub["handle"]] = "Subcomponent"
+
+            for info_ind in range(stored_information):
+                info_kind = rnd.choice(INFORMATION_KINDS)
+                info = item(
+                    f"{component['handle']}-i{info_ind}",
+                    f"{info_kind} of {component['name']}",
+                    "Information",
+                    f"{info_kind} stored in {component['name']}.",
+                )
+                items[info["handle"]] = info
+                component["parts"][info["handle"]] = "Stored_Information"
+
+            if comp_ind % components_per_medium == 0:
+                medium_kind = rnd.choice(MEDIUM_KINDS)
+                medium = item(
+                    f"{model_prefix}-m{comp_ind // components_per_medium}",
+                    f"{medium_kind} {model_ind}.{comp_ind // components_per_medium}",
+                    "Communication_Medium",
+                    f"{medium_kind} shared by a group of components.",
+                )
+                items[medium["handle"]] = medium
+                medium_handle = medium["handle"]
+            component["parts"][medium_handle] = "Communication_Medium"
+
+        # interfaces are wired mostly between neighbouring components, with
+        # some long-range links, which gives the attack graph both long
+        # chains and shortcuts
+        for comp_ind, handle in enumerate(component_handles):
+            for _ in range(interfaces):
+                if rnd.random() < 0.8:
+                    offset = rnd.randint(1, components_per_medium)
+                    target = component_handles[(comp_ind + offset) % components]
+                else:
+                    target = rnd.choice(component_handles)
+                if target != handle and target not in items[handle]["parts"]:
+                    items[handle]["parts"][target] = rnd.choice(
+                        ["Input_Interface", "Output_Interface"]
+                    )
+
+    return items
@@ -0,0 +1,133 @@
+import argparse
+import json
+import time
+from neo4j import Query
+from neo4j.exceptions import ClientError
+from adapters import neo4j_adapter
+from adapters.neo4j_adapter import SWNeo4j, driver
+from benchmarks.system_model_generator import generate_system_model
+
+# Loads generated system models of increasing size into the Neo4j instance
+# configured in .streamlit/secrets.toml and records latency, rows returned and
+# database hits of the SWNeo4j queries used by the TARA flow, e.g.
+#   python -m benchmarks.tara_graph_benchmark --sizes 1000 10000 100000 1000000
+
+
+def db_hits(profile):
+    if not profile:
+        return None
+    return profile.get("dbHits", 0) + sum(
+        db_hits(child) for child in profile.get("children", [])
+    )
+
+
+def profile_query(query, params, timeout):
+    """Run a query with PROFILE and return latency, rows and db hits, or the
+    timeout if the query does not finish in time."""
+    with driver.session() as session:
+        start = time.perf_counter()
+        try:
+            result = session.run(Query("PROFILE " + query, timeout=timeout), params)
+            rows = sum(1 for _ in result)
+            summary = result.consume()
+        except ClientError as e:
+            return {"error": e.code, "seconds": round(time.perf_counter() - start, 3)}
+        return {
+            "seconds": round(time.perf_counter() - start, 4),
+            "rows": rows,
+            "db_hits": db_hits(summary.profile),
+        }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return round(time.perf_counter() - start, 3)
+
+
+def delete_generated(prefix):
+    with driver.session() as session:
+        session.run(
+            "MATCH (n:Item) WHERE n.object_id STARTS WITH $prefix "
+            "CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS",
+            {"prefix": prefix},
+        )
+
+
+def benchmark_cases(sw_items, prefix):
+    model = sw_items[f"{prefix}-0-model"]
+    tara = sw_items[f"{prefix}-0-tara"]
+
+    return {
+        "find_item_definitions": (neo4j_adapter.ITEM_DEFINITIONS_QUERY, {}),
+        "find_security_properties": (
+            neo4j_adapter.SECURITY_PROPERTIES_QUERY,
+            {"tara_handle": tara["handle"]},
+        ),
+        "find_item_elements": (
+            neo4j_adapter.ITEM_ELEMENTS_QUERY,
+            {"item_name": model["name"]},
+        ),
+    }
+
+
+def paths_case(sw_items, prefix):
+    model = sw_items[f"{prefix}-0-model"]
+    # the last component is the deepest target of the interface chains
+    return model["name"], sw_items[list(model["parts"])[-1]]["name"]
+
+
+def run(args):
+    neo4j = SWNeo4j()
+    results = []
+    for size in args.sizes:
+        delete_generated(args.prefix)
+        sw_items = generate_system_model(
+            size,
+            models=args.models,
+            subcomponents=args.subcomponents,
+            interfaces=args.interfaces,
+            seed=args.seed,
+            prefix=args.prefix,
+        )
+        result = {"size": len(sw_items)}
+        result["insert_data"] = timed(neo4j.insert_data, sw_items, 1000, False)
+        result["add_attack_graph"] = timed(neo4j.add_attack_graph)
+
+        for name, (query, params) in benchmark_cases(sw_items, args.prefix).items():
+            result[name] = profile_query(query, params, args.timeout)
+        # attack paths are searched in the in-process graph snapshot
+        item_name, asset_name = paths_case(sw_items, args.prefix)
+        result["find_paths_to_asset"] = timed(
+            lambda: list(neo4j.find_paths_to_asset(item_name, asset_name, 10))
+        )
+
+        print(json.dumps(result))
+        results.append(result)
+
+    if not args.keep:
+        delete_generated(args.prefix)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TARA graph query benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--models", type=int, default=1)
+    parser.add_argument("--subcomponents", type=int, default=3)
+    parser.add_argument("--interfaces", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds per query")
+    parser.add_argument("--keep", action="store_true", help="keep the last model")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+class ReachabilityIndex:
+    """Transitive closure of a directed graph over compact node ids.
+
+    Strongly connected components are condensed first (all members of a
+    component reach the same nodes), then the closure of every component is
+    stored as a Python int bitset over component ids. "Can x reach y" is a
+    single bit test and the nodes reaching a target are found by testing the
+    target's bit for each candidate.
+    """
+
+    def __init__(self, node_ids, components, reach, entry_points) -> None:
+        self.node_ids = node_ids
+        self.ids = {node_id: ind for ind, node_id in enumerate(node_ids)}
+        self.components = components
+        self.reach = reach
+        self.entry_points = entry_points
+
+    @classmethod
+    def build(cls, node_ids, edges):
+        node_ids = list(dict.fromkeys(node_ids))
+        ids = {node_id: ind for ind, node_id in enumerate(node_ids)}
+        successors = [[] for _ in node_ids]
+        has_incoming = [False] * len(node_ids)
+        for source, target in edges:
+            if source in ids and target in ids and source != target:
+                successors[ids[source]].append(ids[target])
+                has_incoming[ids[target]] = True
+
+        components, component_count = strongly_connected_components(successors)
+
+        # Tarjan numbers components in reverse topological order, so the
+        # successors of a component always have a smaller id and are done
+        reach = [0] * component_count
+        members = [[] for _ in range(component_count)]
+        for node, component in enumerate(components):
+            members[component].append(node)
+        for component in range(component_count):
+            bits = 1 << component
+            for node in members[component]:
+                for successor in successors[node]:
+                    if components[successor] != component:
+                        bits |= reach[components[successor]]
+            reach[component] = bits
+
+        entry_points = [
+            node for node in range(len(node_ids)) if not has_incoming[node]
+        ]
+        return cls(node_ids, components, reach, entry_points)
+
+    def can_reach(self, source_id, target_id):
+        if source_id not in self.ids or target_id not in self.ids:
+            return False
+        source = self.components[self.ids[source_id]]
+        target = self.components[self.ids[target_id]]
+        return bool(self.reach[source] >> target & 1)
+
+    def reaching(self, target_id, candidates=None):
+        """Return the node ids that can reach the target, restricted to the
+        given candidate node ids (all nodes by default)."""
+        if target_id not in self.ids:
+            return []
+        target = self.components[self.ids[target_id]]
+        if candidates is None:
+            nodes = range(len(self.node_ids))
+        else:
+            nodes = [self.ids[c] for c in candidates if c in self.ids]
+        return [
+            self.node_ids[node]
+            for node in nodes
+            if node != self.ids[target_id]
+            and self.reach[self.components[node]] >> target & 1
+        ]
+
+    def entry_points_for(self, target_id):
+        """Entry points (nodes without incoming edges) that can reach the
+        target, in O(number of entry points)."""
+        return self.reaching(
+            target_id, [self.node_ids[node] for node in self.entry_points]
+        )
+
+    def to_dict(self):
+        return {
+            "node_ids": self.node_ids,
+            "components": self.components,
+            "reach": [format(bits, "x") for bits in self.reach],
+            "entry_points": self.entry_points,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["node_ids"],
+            data["components"],
+            [int(bits, 16) for bits in data["reach"]],
+            data["entry_points"],
+        )
+
+
+def strongly_connected_components(successors):
+    """Iterative Tarjan. Returns the component id of every node and the number
+    of components; ids are assigned in reverse topological order."""
+    node_count = len(successors)
+    index = [-1] * node_count
+    low = [0] * node_count
+    on_stack = [False] * node_count
+    components = [-1] * node_count
+    stack = []
+    counter = 0
+    component_count = 0
+
+    for root in range(node_count):
+        if index[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            recurse = False
+            for ind in range(child, len(successors[node])):
+                successor = successors[node][ind]
+                if index[successor] < 0:
+                    work.append((node, ind + 1))
+                    work.append((successor, 0))
+                    recurse = True
+                    break
+                if on_stack[successor]:
+                    low[node] = min(low[node], index[successor])
+            if recurse:
+                continue
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    components[member] = component_count
+                    if member == node:
+                        break
+                component_count += 1
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+
+    return components, component_count
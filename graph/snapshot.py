@@ -0,0 +1,297 @@
+import heapq
+from collections import deque
+import numpy as np
+import networkx as nx
+from graph.reachability import ReachabilityIndex
+
+ATTACK_RELATION = "Possible_Attack"
+
+
+class GraphSnapshot:
+    """In-memory copy of an item subgraph for local graph analytics.
+
+    Nodes get compact integer ids in the order they are given and edges are
+    kept in compressed sparse row form (outgoing and incoming), each edge
+    tagged with the id of its relation type. All queries take and return
+    node object ids.
+    """
+
+    def __init__(self, nodes, edges, version=None) -> None:
+        self.version = version
+        self.node_ids = [n["node_id"] for n in nodes]
+        self.names = [n.get("node_name") for n in nodes]
+        self.descriptions = [n.get("node_description") for n in nodes]
+        self.ids = {node_id: ind for ind, node_id in enumerate(self.node_ids)}
+
+        self.rel_types = sorted({rel_type for _, rel_type, _ in edges})
+        rel_ids = {rel_type: ind for ind, rel_type in enumerate(self.rel_types)}
+        edges = [
+            (self.ids[source], rel_ids[rel_type], self.ids[target])
+            for source, rel_type, target in edges
+            if source in self.ids and target in self.ids
+        ]
+        edge_array = np.array(edges, dtype=np.int64).reshape(-1, 3)
+        sources, types, targets = edge_array.T
+
+        self.out_indptr, self.out_indices, self.out_types = self.__csr(
+            sources, targets, types
+        )
+        self.in_indptr, self.in_indices, self.in_types = self.__csr(
+            targets, sources, types
+        )
+        self.reachability_index = None
+
+    def __csr(self, sources, targets, types):
+        order = np.argsort(sources, kind="stable")
+        counts = np.bincount(sources, minlength=len(self.node_ids))
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        return indptr, targets[order], types[order]
+
+    @classmethod
+    def from_records(cls, records, version=None):
+        """Build a snapshot from SWNeo4j.find_item_graph rows."""
+        nodes = []
+        edges = []
+        for record in records:
+            nodes.append(
+                {
+                    "node_id": record["node_id"],
+                    "node_name": record["node_name"],
+                    "node_description": record["node_description"],
+                }
+            )
+            edges.extend(
+                (record["node_id"], rel_type, target)
+                for rel_type, target in record["edges"]
+            )
+        return cls(nodes, edges, version)
+
+    def __type_mask(self, rel_types):
+        if rel_types is None:
+            return None
+        if isinstance(rel_types, str):
+            rel_types = [rel_types]
+        return np.isin(
+            np.arange(len(self.rel_types)),
+            [self.rel_types.index(t) for t in rel_types if t in self.rel_types],
+        )
+
+    def neighbors(self, node, rel_types=None, reverse=False):
+        """Compact ids of the successors (or predecessors) of a compact id."""
+        return self.__neighbors(node, self.__type_mask(rel_types), reverse)
+
+    def __neighbors(self, node, mask, reverse=False):
+        if reverse:
+            indptr, indices, types = self.in_indptr, self.in_indices, self.in_types
+        else:
+            indptr, indices, types = self.out_indptr, self.out_indices, self.out_types
+        start, end = indptr[node], indptr[node + 1]
+        if mask is None:
+            return indices[start:end]
+        return indices[start:end][mask[types[start:end]]]
+
+    def edges(self, rel_types=None):
+        """Source and target compact ids of all edges of the given types."""
+        sources = np.repeat(
+            np.arange(len(self.node_ids)), np.diff(self.out_indptr)
+        )
+        mask = self.__type_mask(rel_types)
+        if mask is None:
+            return sources, self.out_indices
+        selected = mask[self.out_types]
+        return sources[selected], self.out_indices[selected]
+
+    def bfs(self, source_id, rel_types=ATTACK_RELATION, reverse=False, max_depth=None):
+        """Hop distance of every node reachable from the source."""
+        if source_id not in self.ids:
+            return {}
+        source = self.ids[source_id]
+        mask = self.__type_mask(rel_types)
+        distances = {source: 0}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if max_depth is not None and distances[node] >= max_depth:
+                continue
+            for neighbor in self.__neighbors(node, mask, reverse):
+                neighbor = int(neighbor)
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    queue.append(neighbor)
+        return {self.node_ids[node]: dist for node, dist in distances.items()}
+
+    def shortest_path(self, source_id, target_id, rel_types=ATTACK_RELATION):
+        if source_id not in self.ids or target_id not in self.ids:
+            return None
+        source, target = self.ids[source_id], self.ids[target_id]
+        mask = self.__type_mask(rel_types)
+        parents = {source: None}
+        queue = deque([source])
+        while queue and target not in parents:
+            node = queue.popleft()
+            for neighbor in self.__neighbors(node, mask):
+                neighbor = int(neighbor)
+                if neighbor not in parents:
+                    parents[neighbor] = node
+                    queue.append(neighbor)
+        if target not in parents:
+            return None
+        path = []
+        node = target
+        while node is not None:
+            path.append(self.node_ids[node])
+            node = parents[node]
+        return path[::-1]
+
+    def __cheapest_path(self, start, target, sources, mask, costs, blocked_nodes, blocked_edges):
+        """Dijkstra from start, where start -1 is a virtual root whose
+        successors are the sources; entering a node costs its cost."""
+        distances = {start: 0.0}
+        parents = {start: None}
+        heap = [(0.0, start)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if distance > distances[node]:
+                continue
+            successors = sources if node < 0 else self.__neighbors(node, mask)
+            for successor in successors:
+                successor = int(successor)
+                if successor in blocked_nodes or (node, successor) in blocked_edges:
+                    continue
+                candidate = distance + costs[successor]
+                if candidate < distances.get(successor, np.inf):
+                    distances[successor] = candidate
+                    parents[successor] = node
+                    heapq.heappush(heap, (candidate, successor))
+        if target not in parents:
+            return None
+        path = []
+        node = target
+        while node is not None:
+            path.append(node)
+            node = parents[node]
+        return distances[target], path[::-1]
+
+    def cheapest_paths(
+        self, source_ids, target_id, k=3, node_costs=None, rel_types=ATTACK_RELATION
+    ):
+        """The k cheapest simple paths from any of the sources to the target
+        (Yen's algorithm), cheapest first, as (cost, node ids) pairs.
+
+        The cost of a path is the sum of the costs of its nodes, 1 for nodes
+        without a cost in node_costs, i.e. its number of nodes by default.
+        Every further path takes at most one shortest path search per node
+        of the path before it, instead of enumerating all paths.
+        """
+        sources = sorted({self.ids[s] for s in source_ids if s in self.ids})
+        if target_id not in self.ids or not sources:
+            return []
+        target = self.ids[target_id]
+        mask = self.__type_mask(rel_types)
+        costs = np.ones(len(self.node_ids))
+        for node_id, cost in (node_costs or {}).items():
+            if node_id in self.ids:
+                costs[self.ids[node_id]] = cost
+
+        # paths start at the virtual root -1, so the spur at the root finds
+        # the paths from the other sources
+        first = self.__cheapest_path(-1, target, sources, mask, costs, set(), set())
+        if first is None:
+            return []
+        found = [first]
+        candidates = []
+        seen = {tuple(first[1])}
+        while len(found) < k:
+            _, previous = found[-1]
+            for ind in range(len(previous) - 1):
+                root = previous[: ind + 1]
+                blocked_edges = {
+                    (path[ind], path[ind + 1])
+                    for _, path in found
+                    if path[: ind + 1] == root
+                }
+                spur = self.__cheapest_path(
+                    root[-1], target, sources, mask, costs, set(root[:-1]), blocked_edges
+                )
+                if spur is None:
+                    continue
+                path = tuple(root[:-1] + spur[1])
+                if path not in seen:
+                    seen.add(path)
+                    cost = costs[root[1:]].sum() + spur[0]
+                    heapq.heappush(candidates, (cost, path))
+            if not candidates:
+                break
+            cost, path = heapq.heappop(candidates)
+            found.append((cost, list(path)))
+        return [
+            (float(cost), [self.node_ids[node] for node in path[1:]])
+            for cost, path in found
+        ]
+
+    def reachability(self):
+        """Reachability index over the Possible_Attack edges."""
+        if self.reachability_index is None:
+            mask = self.__type_mask(ATTACK_RELATION)
+            edges = [
+                (self.node_ids[node], self.node_ids[int(target)])
+                for node in range(len(self.node_ids))
+                for target in self.__neighbors(node, mask)
+            ]
+            self.reachability_index = ReachabilityIndex.build(self.node_ids, edges)
+        return self.reachability_index
+
+    def impacted(self, source_id, max_depth=None):
+        """Nodes an attacker can move on to after compromising the source,
+        with their hop distance."""
+        impacted = self.bfs(source_id, ATTACK_RELATION, max_depth=max_depth)
+        impacted.pop(source_id, None)
+        return impacted
+
+    def to_networkx(self, rel_types=ATTACK_RELATION):
+        mask = self.__type_mask(rel_types)
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.node_ids)
+        for node in range(len(self.node_ids)):
+            graph.add_edges_from(
+                (self.node_ids[node], self.node_ids[int(target)])
+                for target in self.__neighbors(node, mask)
+            )
+        return graph
+
+    def pagerank(self, rel_types=ATTACK_RELATION, alpha=0.85, max_iter=100, tol=1.0e-6):
+        """PageRank by power iteration over the CSR edges, as nx.pagerank
+        needs scipy. Nodes without outgoing edges spread their rank evenly."""
+        n = len(self.node_ids)
+        if n == 0:
+            return {}
+        sources, targets = self.edges(rel_types)
+        # parallel edges of different types count once, as in a DiGraph
+        pairs = np.unique(np.stack([sources, targets], axis=1), axis=0).reshape(-1, 2)
+        sources, targets = pairs[:, 0], pairs[:, 1]
+        out_degree = np.bincount(sources, minlength=n)
+        dangling = out_degree == 0
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            previous = rank
+            spread = np.bincount(
+                targets, weights=previous[sources] / out_degree[sources], minlength=n
+            )
+            rank = alpha * (spread + previous[dangling].sum() / n) + (1 - alpha) / n
+            if np.abs(rank - previous).sum() < n * tol:
+                break
+        return dict(zip(self.node_ids, rank.tolist()))
+
+    def centrality(self, kind="betweenness", rel_types=ATTACK_RELATION):
+        if kind == "pagerank":
+            return self.pagerank(rel_types)
+        graph = self.to_networkx(rel_types)
+        if kind == "betweenness":
+            return nx.betweenness_centrality(graph)
+        if kind == "in_degree":
+            return nx.in_degree_centrality(graph)
+        if kind == "out_degree":
+            return nx.out_degree_centrality(graph)
+        raise ValueError(f"unsupported centrality: {kind}")
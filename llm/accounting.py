@@ -0,0 +1,81 @@
+import threading
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+from tara.chunking import count_tokens
+
+
+class ChainUsageHandler(BaseCallbackHandler):
+    """Adds the prompt and answer tokens of every LLM call to one chain's
+    usage."""
+
+    def __init__(self, usage, chain) -> None:
+        self.usage = usage
+        self.chain = chain
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.usage.add(
+            self.chain, calls=len(prompts), prompt=sum(count_tokens(p) for p in prompts)
+        )
+
+    def on_llm_end(self, response, **kwargs):
+        self.usage.add(
+            self.chain,
+            completion=sum(
+                count_tokens(g.text) for gens in response.generations for g in gens
+            ),
+        )
+
+
+class TokenUsage:
+    """Tokens per chain.
+
+    Every chain registers its static prompt prefix and the prefix it would
+    have with the verbose JSON-schema instructions. The prefix comes before
+    the variable input, so after the first call Ollama can take it from its
+    prompt cache; the report shows those reusable tokens, an upper bound as
+    the cache may have been evicted in between, and the tokens the compact
+    schema saved.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.prefixes = {}
+        self.totals = {}
+
+    def register(self, chain, prefix_tokens, baseline_prefix_tokens=None):
+        self.prefixes[chain] = (
+            prefix_tokens,
+            prefix_tokens if baseline_prefix_tokens is None else baseline_prefix_tokens,
+        )
+        return ChainUsageHandler(self, chain)
+
+    def add(self, chain, calls=0, prompt=0, completion=0):
+        with self.lock:
+            totals = self.totals.setdefault(chain, [0, 0, 0])
+            totals[0] += calls
+            totals[1] += prompt
+            totals[2] += completion
+
+    def frame(self):
+        chains = list(self.totals)
+        calls = [self.totals[c][0] for c in chains]
+        prefixes = [self.prefixes.get(c, (0, 0)) for c in chains]
+        return pd.DataFrame(
+            {
+                "Chain": chains,
+                "Calls": calls,
+                "Prompt Tokens": [self.totals[c][1] for c in chains],
+                "Completion Tokens": [self.totals[c][2] for c in chains],
+                "Prefix Tokens": [p[0] for p in prefixes],
+                "Reusable Prefix Tokens (upper bound)": [
+                    p[0] * max(n - 1, 0) for p, n in zip(prefixes, calls)
+                ],
+                "Saved by Compact Schema": [
+                    (p[1] - p[0]) * n for p, n in zip(prefixes, calls)
+                ],
+            }
+        )
+
+
+# token usage of all chains in this process
+usage = TokenUsage()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+
+class SQLiteResponseCache(BaseCache):
+    """LLM responses on local disk, shared by all processes using the file.
+
+    Entries are keyed by the model string (model name and parameters) and the
+    prompt with whitespace normalised. Entries older than ttl seconds are
+    ignored and removed, and beyond max_entries the least recently used ones
+    are evicted. Hits and misses are counted per process.
+    """
+
+    def __init__(
+        self, path="./llm_cache/responses.sqlite", ttl=7 * 24 * 3600, max_entries=10000
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL, accessed REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+
+    @contextmanager
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def key(prompt, llm_string):
+        prompt = re.sub(r"\s+", " ", prompt).strip()
+        return hashlib.sha256((llm_string + "\0" + prompt).encode()).hexdigest()
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, prompt, llm_string):
+        key = self.key(prompt, llm_string)
+        now = time.time()
+        with self.connect() as connection:
+            row = connection.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                connection.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                )
+        self.count(row is not None)
+        if row is None:
+            return None
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt, llm_string, return_val):
+        now = time.time()
+        response = json.dumps([dumps(generation) for generation in return_val])
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (self.key(prompt, llm_string), response, now, now),
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self, **kwargs):
+        with self.connect() as connection:
+            connection.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self.connect() as connection:
+            entries = connection.execute("SELECT count(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
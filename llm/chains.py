@@ -1,6 +1,6 @@
+import asyncio
 from langchain.chains import GraphCypherQAChain
 from langchain.chains import RetrievalQA
-from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.pydantic_v1 import BaseModel, Field
 
 from langchain.prompts import (
@@ -20,6 +20,8 @@ from utils import (
 )
 from typing import List, Any
 from adapters.neo4j_adapter import Neo4j
+from llm import structured
+from llm.streaming import ItemStream
 
 
 def configure_llm_only_chain(llm):
@@ -98,6 +100,16 @@ def configure_llm_cypher_chain(llm):
     return cypher_chain
 
 
+def json_parser(model, json_mode=False):
+    """Output parser and format instructions for a result model. In JSON
+    mode the model is constrained to JSON already, so a compact schema
+    replaces the verbose JSON schema instructions."""
+    parser = structured.RepairingJsonOutputParser(pydantic_object=model)
+    if json_mode:
+        return parser, structured.format_instructions(model)
+    return parser, parser.get_format_instructions()
+
+
 class SWModelEleemnt(BaseModel):
     name: str = Field(description="element name")
     is_asset: bool = Field(description="element is an asset")
@@ -130,27 +142,32 @@ class SWModelElements(BaseModel):
     elements: List[SWModelEleemnt] = Field(description="list of elements")
 
 
-def configure_asset_chain(llm):
+def asset_prompt(json_mode=False):
     template = """
-    As input you get a list of vehicle design elements, their relationships and the security propoerties you should consider:
-    {input}
+    As input you get a list of vehicle design elements, their relationships and the security propoerties you should consider.
     Forv each element in the list you need to first determine whether it could be considered as an asset as defined by the ISO standard. 
     If you do not recognize the element, mark it as not an asset and move to the next one.
     If you considered an element is an asset, then you should specify which security properties are important for that asset.  
     You shouldf focus only on the security properties provided to you as input. 
     Follow the format instructions to generate the output and do not provide any additional information.
     {format_instructions}
+    Input:
+    {input}
     
     """
-    parser = JsonOutputParser(pydantic_object=SWModelElements)
-    format_instructions = parser.get_format_instructions()
+    parser, format_instructions = json_parser(SWModelElements, json_mode)
     chat_prompt = PromptTemplate.from_template(
         template, partial_variables={"format_instructions": format_instructions}
     )
+    return chat_prompt, parser
+
+
+def configure_asset_chain(llm, json_mode=False):
+    chat_prompt, parser = asset_prompt(json_mode)
 
     def generate_llm_output(
         user_input, callbacks: List[Any], prompt=chat_prompt
-    ) -> str:  # using dict or other types raises error
+    ) -> SWModelElements:  # using dict or other input types raises error
 
         chain = prompt | llm | parser
         answer = chain.invoke(
@@ -160,7 +177,50 @@ def configure_asset_chain(llm):
             },
         )
 
-        return str(answer)
+        return SWModelElements.parse_obj(answer)
+
+    return generate_llm_output
+
+
+def configure_asset_batch_chain(llm, max_concurrency=4, json_mode=False):
+    """Asset identification over several element chunks at once. Returns
+    the SWModelElements of every chunk, in input order, or the exception of
+    a chunk that failed again when retried; with on_item, every element is
+    passed on as soon as it has streamed."""
+    chat_prompt, parser = asset_prompt(json_mode)
+    chain = chat_prompt | llm | parser
+
+    def generate_llm_output(user_inputs, callbacks: List[Any] = [], on_item=None):
+        streams = [ItemStream(SWModelElements, "elements", on_item) for _ in user_inputs]
+        configs = [
+            {"callbacks": callbacks + [s], "max_concurrency": max_concurrency}
+            for s in streams
+        ]
+        answers = asyncio.run(
+            chain.abatch(
+                [{"input": i} for i in user_inputs],
+                config=configs,
+                return_exceptions=True,
+            )
+        )
+        results = []
+        for user_input, config, stream, answer in zip(
+            user_inputs, configs, streams, answers
+        ):
+            try:
+                if isinstance(answer, Exception):
+                    raise answer
+                results.append(SWModelElements.parse_obj(answer))
+            except Exception:
+                # a failed chunk is retried once on its own
+                try:
+                    answer = chain.invoke({"input": user_input}, config=config)
+                    results.append(SWModelElements.parse_obj(answer))
+                except Exception as e:
+                    results.append(e)
+                    continue
+            stream.close(answer)
+        return results
 
     return generate_llm_output
 
@@ -177,10 +237,9 @@ class ThreatScenarios(BaseModel):
     scenarios: List[ThreatScenario] = Field(description="list of threat scenarios")
 
 
-def configure_threat_chain(llm):
+def threat_prompt(json_mode=False):
     template = """
-    As input you get the following list of vehicle assets and their important security properties:
-    {input} 
+    As input you get the following list of vehicle assets and their important security properties.
     Forv each asset in the list you need to specify at least one threat scenarios that would lead to the compromise of at least one of the asset's security propoerties. 
     You should lookup scenarios in the ATM database which could be found here (https://atm.automotiveisac.com/home).
     You need to make sure that the final list of threat scenarios cover all the security properties impotant for that asset. For example, if the asset has only one security property, then one threat scenario would be enough. 
@@ -189,17 +248,23 @@ def configure_threat_chain(llm):
     If you do not recognize the asset, ignore it and move to the next one.
     Follow the format instructions to generate the output and do not provide any additional information.
     {format_instructions}
+    Input:
+    {input}
     
     """
-    parser = JsonOutputParser(pydantic_object=ThreatScenarios)
-    format_instructions = parser.get_format_instructions()
+    parser, format_instructions = json_parser(ThreatScenarios, json_mode)
     chat_prompt = PromptTemplate.from_template(
         template, partial_variables={"format_instructions": format_instructions}
     )
+    return chat_prompt, parser
+
+
+def configure_threat_chain(llm, json_mode=False):
+    chat_prompt, parser = threat_prompt(json_mode)
 
     def generate_llm_output(
         user_input: str, callbacks: List[Any], prompt=chat_prompt
-    ) -> str:  # using dict or other types raises error
+    ) -> ThreatScenarios:  # using dict or other input types raises error
 
         chain = prompt | llm | parser
         answer = chain.invoke(
@@ -209,7 +274,7 @@ def configure_threat_chain(llm):
             },
         )
 
-        return str(answer)
+        return ThreatScenarios.parse_obj(answer)
 
     return generate_llm_output
 
@@ -244,27 +309,31 @@ class DamageScenarios(BaseModel):
     scenarios: List[DamageScenario] = Field(description="list of damage scenarios")
 
 
-def configure_damage_chain(llm):
+def damage_prompt(json_mode=False):
     template = """
     As input you get a list of vehicle assets and their associated cyber threats.  
-    {input}   
     For each pair of (asset, threat scenario) in the list you need to specify the worst-case damage scenario that would ocuur as a result of successfully implementing the threat scenario. 
     If you do not recognize the asset, ignore it and move to the next one.
     For each damage scenario you come up with, you should assess potential adverse consequences for road users in the impact categories of safety, financial, operational, and privacy respectively.
     Follow the format instructions to generate the output and do not provide any additional information.
-    
     {format_instructions}
+    Input:
+    {input}
     
     """
-    parser = JsonOutputParser(pydantic_object=DamageScenarios)
-    format_instructions = parser.get_format_instructions()
+    parser, format_instructions = json_parser(DamageScenarios, json_mode)
     chat_prompt = PromptTemplate.from_template(
         template, partial_variables={"format_instructions": format_instructions}
     )
+    return chat_prompt, parser
+
+
+def configure_damage_chain(llm, json_mode=False):
+    chat_prompt, parser = damage_prompt(json_mode)
 
     def generate_llm_output(
         user_input: str, callbacks: List[Any], prompt=chat_prompt
-    ) -> str:  # using dict or other types raises error
+    ) -> DamageScenarios:  # using dict or other input types raises error
 
         chain = prompt | llm | parser
         answer = chain.invoke(
@@ -274,7 +343,7 @@ def configure_damage_chain(llm):
             },
         )
 
-        return str(answer)
+        return DamageScenarios.parse_obj(answer)
 
     return generate_llm_output
 
@@ -315,26 +384,32 @@ class AttackPaths(BaseModel):
     paths: List[AttackPath] = Field(description="list of attack paths")
 
 
-def configure_attack_path_chain(llm):
+def attack_path_prompt(json_mode=False):
     template = """
     As input you get a list of vehicle assets and their associated cyber threats.  
-    {input}   
     For each pair of (asset, threat scenario) in the list you need to specify the worst-case attack path that should be followed to implwement the threat scenario. 
+    Where given, Graph Paths lists the shortest paths through the system model from its entry points to the asset; use them as a starting point.
     After that you need to analyze the feasibility factors (e.g., equipment, knowledge, expertise) on the identified attack path.
     If you do not recognize the asset, ignore it and move to the next one.
     Follow the format instructions to generate the output and do not provide any additional information.
     {format_instructions}
+    Input:
+    {input}
     
     """
-    parser = JsonOutputParser(pydantic_object=AttackPaths)
-    format_instructions = parser.get_format_instructions()
+    parser, format_instructions = json_parser(AttackPaths, json_mode)
     chat_prompt = PromptTemplate.from_template(
         template, partial_variables={"format_instructions": format_instructions}
     )
+    return chat_prompt, parser
+
+
+def configure_attack_path_chain(llm, json_mode=False):
+    chat_prompt, parser = attack_path_prompt(json_mode)
 
     def generate_llm_output(
         user_input: str, callbacks: List[Any], prompt=chat_prompt
-    ) -> str:  # using dict or other types raises error
+    ) -> AttackPaths:  # using dict or other input types raises error
 
         chain = prompt | llm | parser
         answer = chain.invoke(
@@ -344,7 +419,7 @@ def configure_attack_path_chain(llm):
             },
         )
 
-        return str(answer)
+        return AttackPaths.parse_obj(answer)
 
     return generate_llm_output
 
@@ -364,26 +439,31 @@ class Goals(BaseModel):
     goals: List[Goal] = Field(description="list of goals")
 
 
-def configure_goal_chain(llm):
+def goal_prompt(json_mode=False):
     template = """
     As input you get the following list of vehicle assets and their associated cyber threats.  
-    {input} 
     For each pair of (asset, threat scenario) in the list you need to specify the cybersecurity goal that should be realized to reduce the risk of the threat scenario. 
     Then, you should specify at least one cybersecuirty  reuirmeent to address the goal.
     If you do not recognize the asset, ignore it and move to the next one.
     Follow the format instructions to generate the output and do not provide any additional information.
     {format_instructions}
+    Input:
+    {input}
     
     """
-    parser = JsonOutputParser(pydantic_object=Goals)
-    format_instructions = parser.get_format_instructions()
+    parser, format_instructions = json_parser(Goals, json_mode)
     chat_prompt = PromptTemplate.from_template(
         template, partial_variables={"format_instructions": format_instructions}
     )
+    return chat_prompt, parser
+
+
+def configure_goal_chain(llm, json_mode=False):
+    chat_prompt, parser = goal_prompt(json_mode)
 
     def generate_llm_output(
         user_input: str, callbacks: List[Any], prompt=chat_prompt
-    ) -> str:  # using dict or other types raises error
+    ) -> Goals:  # using dict or other input types raises error
 
         chain = prompt | llm | parser
         answer = chain.invoke(
@@ -393,6 +473,6 @@ def configure_goal_chain(llm):
             },
         )
 
-        return str(answer)
+        return Goals.parse_obj(answer)
 
     return generate_llm_output
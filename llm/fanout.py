@@ -0,0 +1,128 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, List
+import pandas as pd
+from llm.streaming import ItemStream
+from tara import chunking
+
+
+class FanOutChain:
+    """Runs a TARA step chain once per group of input rows instead of once
+    for the whole DataFrame.
+
+    Groups are sent concurrently with ainvoke, at most max_concurrency at a
+    time. A group whose call or output validation fails is retried on its
+    own with exponential backoff; groups still failing after the retries are
+    returned separately so that only they need to run again. With on_item,
+    every result item is passed on as soon as it has streamed.
+
+    Rows go into the prompt as compact CSV of the given columns; a group
+    whose CSV exceeds token_budget is split into several calls. A limiter
+    (a threading semaphore) caps the calls of all chains sharing it, also
+    across threads.
+    """
+
+    def __init__(
+        self,
+        chain,
+        result_model,
+        list_field,
+        max_concurrency=4,
+        retries=2,
+        retry_delay=1.0,
+        columns=None,
+        token_budget=None,
+        limiter=None,
+    ) -> None:
+        self.chain = chain
+        self.result_model = result_model
+        self.list_field = list_field
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.columns = columns
+        self.token_budget = token_budget
+        self.limiter = limiter
+
+    @asynccontextmanager
+    async def limit(self):
+        if self.limiter is None:
+            yield
+            return
+        await asyncio.to_thread(self.limiter.acquire)
+        try:
+            yield
+        finally:
+            self.limiter.release()
+
+    def split(self, rows, key):
+        """Groups of rows with equal key columns, each within token_budget."""
+        groups = []
+        for _, group in rows.groupby(key, sort=False):
+            if self.token_budget is None:
+                groups.append(group)
+            else:
+                groups.extend(
+                    chunking.chunk_rows(group, self.columns, self.token_budget)
+                )
+        return groups
+
+    async def ainvoke_group(self, semaphore, user_input, callbacks, on_item=None):
+        stream = ItemStream(self.result_model, self.list_field, on_item)
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore, self.limit():
+                    answer = await self.chain.ainvoke(
+                        {"input": user_input},
+                        config={"callbacks": callbacks + [stream]},
+                    )
+                result = self.result_model.parse_obj(answer)
+                stream.close(answer)
+                return result
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_delay * 2**attempt)
+        return error
+
+    async def abatch(self, user_inputs, callbacks: List[Any] = [], on_item=None):
+        """Result model or exception of every input, in input order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(
+            *(
+                self.ainvoke_group(semaphore, i, callbacks, on_item)
+                for i in user_inputs
+            )
+        )
+
+    def run(self, rows, key, callbacks: List[Any] = [], on_item=None):
+        """Run the chain per group of rows with equal key columns and return
+        the merged result model and the rows of the groups that failed."""
+        merged, failed, _ = self.run_tagged(rows, key, None, callbacks, on_item)
+        return merged, failed
+
+    def run_tagged(self, rows, key, tag, callbacks: List[Any] = [], on_item=None):
+        """Like run, and also return the value of the tag column in the group
+        every result item was generated from, e.g. the element id."""
+        groups = self.split(rows, key)
+        answers = asyncio.run(
+            self.abatch(
+                [chunking.rows_text(g, self.columns) for g in groups],
+                callbacks,
+                on_item,
+            )
+        )
+
+        items = []
+        tags = []
+        failed = []
+        for group, answer in zip(groups, answers):
+            if isinstance(answer, Exception):
+                failed.append(group)
+            else:
+                group_items = getattr(answer, self.list_field)
+                items.extend(group_items)
+                if tag is not None:
+                    tags.extend([group[tag].iloc[0]] * len(group_items))
+        merged = self.result_model(**{self.list_field: items})
+        return merged, pd.concat(failed) if failed else rows.iloc[0:0], tags
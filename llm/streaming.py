@@ -0,0 +1,91 @@
+import json
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class ItemStream(BaseCallbackHandler):
+    """Passes every completed item of a JSON answer to on_item while the
+    answer is still streaming.
+
+    The answer is scanned token by token, so each character is looked at
+    once. An item is the text of an object inside the answer's list, e.g.
+    each {...} in {"scenarios": [{...}, {...}]}; it is emitted as soon as
+    its closing brace arrives and it validates against the item model.
+    Answers that are not streamed (e.g. cache hits) are emitted by close.
+    Items are counted by position, so a retried answer only emits the
+    items beyond those already emitted.
+    """
+
+    # called in the thread of the chain, so that on_item may update the UI
+    run_inline = True
+
+    def __init__(self, result_model, list_field, on_item=None) -> None:
+        self.item_model = result_model.__fields__[list_field].type_
+        self.list_field = list_field
+        self.on_item = on_item
+        self.emitted = 0
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.found = 0
+        self.depth = 0
+        self.item_depth = None
+        self.item_start = None
+        self.in_string = False
+        self.escaped = False
+
+    def emit(self, entry):
+        self.found += 1
+        if self.found <= self.emitted:
+            return
+        self.emitted = self.found
+        try:
+            item = self.item_model.parse_obj(entry)
+        except Exception:
+            # the whole answer fails validation later and is retried
+            return
+        if self.on_item is not None:
+            self.on_item(item)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.reset()
+
+    def on_llm_new_token(self, token, **kwargs):
+        start = len(self.text)
+        self.text += token
+        for pos in range(start, len(self.text)):
+            c = self.text[pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c in "{[":
+                self.depth += 1
+                if self.item_depth is None:
+                    # items sit in the top-level list or in the list inside
+                    # the top-level object
+                    self.item_depth = 2 if c == "[" else 3
+                if self.depth == self.item_depth and c == "{":
+                    self.item_start = pos
+            elif c in "}]":
+                if self.depth == self.item_depth and self.item_start is not None:
+                    try:
+                        entry = json.loads(self.text[self.item_start : pos + 1])
+                    except ValueError:
+                        entry = None
+                    self.item_start = None
+                    self.emit(entry)
+                self.depth -= 1
+
+    def close(self, answer):
+        """Emit the items of the parsed answer that were not streamed."""
+        entries = answer.get(self.list_field) if isinstance(answer, dict) else answer
+        if isinstance(entries, list):
+            self.found = 0
+            for entry in entries:
+                self.emit(entry)
@@ -0,0 +1,115 @@
+import json
+import typing
+from enum import Enum
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.utils.json import parse_json_markdown
+
+LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def field_schema(field):
+    """Compact description of a pydantic (v1) field: nested models as their
+    compact schema, enums as their allowed values."""
+    type_ = field.type_
+    if isinstance(type_, type) and hasattr(type_, "__fields__"):
+        value = compact_schema(type_)
+    elif isinstance(type_, type) and issubclass(type_, Enum):
+        value = " | ".join(str(e.value) for e in type_)
+    else:
+        value = f"{getattr(type_, '__name__', str(type_))}, {field.field_info.description}"
+    if typing.get_origin(field.outer_type_) in (list, typing.List):
+        return [value]
+    return value
+
+
+def compact_schema(model):
+    """An example-like JSON object of the model, far shorter than its JSON
+    schema, e.g. {"goals": [{"goal": "str, ..."}]}."""
+    return {name: field_schema(field) for name, field in model.__fields__.items()}
+
+
+def format_instructions(model):
+    return (
+        "Answer with a single JSON object of this form and nothing else:\n"
+        + json.dumps(compact_schema(model), separators=(",", ":"))
+    )
+
+
+def repair_json(text):
+    """Fix the usual near-misses of LLM JSON: prose or code fences around
+    the JSON, trailing commas and Python literals. Unbalanced brackets or
+    strings raise ValueError, as they mean a cut-off answer that must not
+    pass as complete."""
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("no JSON in the answer")
+    text = text[min(starts) :]
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    pos = 0
+    while pos < len(text):
+        c = text[pos]
+        if in_string:
+            out.append(c)
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+            out.append(c)
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            out.append(c)
+        elif c in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if not stack or stack.pop() != c:
+                raise ValueError("mismatched bracket")
+            out.append(c)
+            if not stack:
+                # anything after the closing bracket is prose
+                break
+        else:
+            word = next((w for w in LITERALS if text.startswith(w, pos)), None)
+            if word is not None:
+                out.append(LITERALS[word])
+                pos += len(word)
+                continue
+            out.append(c)
+        pos += 1
+    if stack or in_string:
+        raise ValueError("unbalanced JSON, the answer was cut off")
+    return "".join(out)
+
+
+class RepairingJsonOutputParser(JsonOutputParser):
+    """JsonOutputParser that repairs near-miss JSON locally instead of
+    failing, which would send the whole generation round again.
+
+    Complete answers are parsed strictly: unlike JsonOutputParser, a
+    truncated answer is not completed by closing its brackets but raises
+    OutputParserException, so that it is retried or reported as failed.
+    """
+
+    def parse_result(self, result, *, partial=False):
+        if partial:
+            return super().parse_result(result, partial=True)
+        text = result[0].text
+        try:
+            return parse_json_markdown(text.strip(), parser=json.loads)
+        except ValueError:
+            pass
+        try:
+            return json.loads(repair_json(text))
+        except ValueError as e:
+            raise OutputParserException(
+                f"Invalid json output: {text}", llm_output=text
+            ) from e
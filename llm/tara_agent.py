@@ -26,23 +26,115 @@ from langchain.prompts import (
 )
 from dotenv import load_dotenv
 from llm import chains
-from utils import load_embedding_model, load_llm
+from utils import (
+    llm_json_mode,
+    llm_max_concurrency,
+    load_embedding_model,
+    load_llm,
+    load_llm_cache,
+    num_ctx,
+)
+from tara import chunking
+from llm.accounting import usage
+from llm.fanout import FanOutChain
 from adapters.neo4j_adapter import SWNeo4j, MITRENeo4j, NVDNeo4j
 from functools import cache
+import threading
 
 langchain.debug = True
 
 
+# input rows of a TARA step are grouped by these columns, one chain call each
+STEP_KEYS = {
+    "threats": ["Element Id"],
+    "damages": ["Asset Name", "Threat Scenario"],
+    "attack_paths": ["Asset Name", "Threat Scenario"],
+    "goals": ["Asset Name", "Threat Scenario"],
+}
+
+# columns of the input rows each step's chain gets, None for all but the
+# Rationale and the element id (the asset table has one column per security
+# property)
+THREAT_COLUMNS = ["Asset Name", "Threat Scenario", "Affected Properties"]
+STEP_COLUMNS = {
+    "threats": None,
+    "damages": THREAT_COLUMNS,
+    "attack_paths": THREAT_COLUMNS + ["Graph Paths"],
+    "goals": THREAT_COLUMNS,
+}
+
+
 @cache
 class TaraAgent:
+    """TARA steps are run directly on their chains; the ReAct agent is only
+    built for free-form requests through generate_response."""
+
     def __init__(self) -> None:
+        # step chains run at temperature 0, so their answers are cached
+        self.llm = load_llm(cache=load_llm_cache(), json_mode=llm_json_mode)
+        # only Ollama models can be constrained to JSON
+        self.json_mode = getattr(self.llm, "format", None) == "json"
+        self.agent_executor = None
+        self.asset_batch_chain = chains.configure_asset_batch_chain(
+            self.llm, llm_max_concurrency, self.json_mode
+        )
+        self.asset_prompt_tokens = chunking.count_tokens(
+            chains.asset_prompt(self.json_mode)[0].format(input="")
+        )
+        # prompts start with their static prefix, the input comes last
+        self.usage_handlers = {
+            "assets": usage.register(
+                "assets",
+                self.asset_prompt_tokens,
+                chunking.count_tokens(chains.asset_prompt()[0].format(input="")),
+            )
+        }
+        self.fan_out_chains = {}
+        # steps may run in parallel threads, all within llm_max_concurrency
+        limiter = threading.BoundedSemaphore(llm_max_concurrency)
+        for step, prompt, model, field in [
+            ("threats", chains.threat_prompt, chains.ThreatScenarios, "scenarios"),
+            ("damages", chains.damage_prompt, chains.DamageScenarios, "scenarios"),
+            ("attack_paths", chains.attack_path_prompt, chains.AttackPaths, "paths"),
+            ("goals", chains.goal_prompt, chains.Goals, "goals"),
+        ]:
+            chat_prompt, parser = prompt(self.json_mode)
+            # the rows get half of the context left by the prompt, the
+            # answer the other half
+            prompt_tokens = chunking.count_tokens(chat_prompt.format(input=""))
+            self.usage_handlers[step] = usage.register(
+                step,
+                prompt_tokens,
+                chunking.count_tokens(prompt()[0].format(input="")),
+            )
+            self.fan_out_chains[step] = FanOutChain(
+                chat_prompt | self.llm | parser,
+                model,
+                field,
+                llm_max_concurrency,
+                columns=STEP_COLUMNS[step],
+                token_budget=max((num_ctx - prompt_tokens) // 2, 1),
+                limiter=limiter,
+            )
+        self.steps = {
+            "assets": self.identify_assets,
+            "threats": self.specify_threats,
+            "damages": self.specify_damages,
+            "attack_paths": self.analyse_attack_paths,
+            "goals": self.identify_goals,
+        }
+
+    def create_agent_executor(self):
+        # the agent itself answers in free text
+        llm = load_llm(cache=load_llm_cache())
         embeddings, _ = load_embedding_model()
-        llm = load_llm()
-        asset_chain = chains.configure_asset_chain(llm)
-        damage_chain = chains.configure_damage_chain(llm)
-        threat_chain = chains.configure_threat_chain(llm)
-        attack_path_chain = chains.configure_attack_path_chain(llm)
-        goal_chain = chains.configure_goal_chain(llm)
+        asset_chain = chains.configure_asset_chain(self.llm, self.json_mode)
+        damage_chain = chains.configure_damage_chain(self.llm, self.json_mode)
+        threat_chain = chains.configure_threat_chain(self.llm, self.json_mode)
+        attack_path_chain = chains.configure_attack_path_chain(
+            self.llm, self.json_mode
+        )
+        goal_chain = chains.configure_goal_chain(self.llm, self.json_mode)
         sw_vector_chain = chains.configure_llm_vector_chain(
             llm, embeddings, SWNeo4j.vector
         )
@@ -150,7 +242,7 @@ class TaraAgent:
             handle_parsing_errors=True,
             verbose=True,
         ) """
-        self.agent_executor = AgentExecutor.from_agent_and_tools(
+        return AgentExecutor.from_agent_and_tools(
             agent=agent,
             tools=tools,
             memory=memory,
@@ -163,7 +255,83 @@ class TaraAgent:
         Create a handler that calls the Conversational agent
         and returns a response to be rendered in the UI
         """
+        if self.agent_executor is None:
+            self.agent_executor = self.create_agent_executor()
 
         response = self.agent_executor.invoke(dict(input=prompt))
 
         return response["output"]
+
+    def identify_assets(self, elements, relations, security_properties, on_item=None):
+        """
+        Run asset identification directly on token-budgeted chunks of
+        related elements, several chunks at a time, and return the merged
+        SWModelElements in element order and the elements of the chunks that
+        failed; on_item gets every element as it streams
+        """
+        prompt_tokens = self.asset_prompt_tokens + chunking.count_tokens(
+            str(security_properties)
+        )
+        chunks = chunking.chunk_elements(elements, relations, num_ctx, prompt_tokens)
+        outputs = self.asset_batch_chain(
+            [
+                f"elements: {chunk}\nrelationships: {chunk_relations}\nsecurity properties: {security_properties}"
+                for chunk, chunk_relations in chunks
+            ],
+            callbacks=[self.usage_handlers["assets"]],
+            on_item=on_item,
+        )
+        failed = [
+            element
+            for (chunk, _), output in zip(chunks, outputs)
+            if isinstance(output, Exception)
+            for element in chunk
+        ]
+        outputs = [output for output in outputs if not isinstance(output, Exception)]
+        return (
+            chains.SWModelElements(elements=chunking.merge_elements(outputs, elements)),
+            failed,
+        )
+
+    def fan_out(self, step, rows, key=None, on_item=None):
+        """
+        Run the chain of a TARA step separately for every group of rows with
+        the same key columns, concurrently, and return the merged result
+        model and the rows that failed; on_item gets every result item as
+        it streams
+        """
+        return self.fan_out_chains[step].run(
+            rows,
+            key or STEP_KEYS[step],
+            callbacks=[self.usage_handlers[step]],
+            on_item=on_item,
+        )
+
+    def specify_threats(self, assets, on_item=None):
+        """ThreatScenarios for an asset DataFrame, the failed rows and the
+        Element Id of the asset of every scenario"""
+        return self.fan_out_chains["threats"].run_tagged(
+            assets,
+            STEP_KEYS["threats"],
+            "Element Id",
+            callbacks=[self.usage_handlers["threats"]],
+            on_item=on_item,
+        )
+
+    def specify_damages(self, threats, on_item=None):
+        """DamageScenarios for a threat DataFrame, and the failed rows"""
+        return self.fan_out("damages", threats, on_item=on_item)
+
+    def analyse_attack_paths(self, threats, on_item=None):
+        """AttackPaths for a threat DataFrame, and the failed rows"""
+        return self.fan_out("attack_paths", threats, on_item=on_item)
+
+    def identify_goals(self, threats, on_item=None):
+        """Goals for a threat DataFrame, and the failed rows"""
+        return self.fan_out("goals", threats, on_item=on_item)
+
+    def run_step(self, step, *args, **kwargs):
+        """
+        Run a TARA step by name without going through the agent
+        """
+        return self.steps[step](*args, **kwargs)
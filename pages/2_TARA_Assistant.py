@@ -1,18 +1,21 @@
 import streamlit as st
 from streamlit.logger import get_logger
 import pandas as pd
-from adapters.neo4j_adapter import SWNeo4j
+from adapters.neo4j_adapter import SWNeo4j, TARANeo4j
 
 import traceback
+from llm.accounting import usage
 from llm.tara_agent import TaraAgent
-import ast
 import utils
+from tara import feasibility, frames, incremental, pipeline, propagation, risk
 
 st.set_page_config("TARA Assistant", page_icon=":copilot:", layout="wide")
 
 
 logger = get_logger(__name__)
 
+THREAT_KEY = pipeline.THREAT_KEY
+
 
 def get_item_defs():
     neo4j = SWNeo4j()
@@ -29,6 +32,18 @@ def get_item_defs():
     ]
 
 
+def live_rows(to_frame):
+    """Table that grows by every result item as it streams, and the
+    callback appending to it. The table is replaced by the final results."""
+    placeholder = st.empty()
+    table = placeholder.dataframe(to_frame([]), hide_index=True)
+
+    def on_item(item):
+        table.add_rows(to_frame([item]))
+
+    return placeholder, on_item
+
+
 def get_assets():
     neo4j = SWNeo4j()  # cached
     tara_handle = st.session_state.selected_item["tara_handle"]
@@ -36,14 +51,9 @@ def get_assets():
         p["p_name"].capitalize() for p in neo4j.find_security_properties(tara_handle)
     ]
 
-    cols = ["Element Name", "Is Asset"]
-    cols.extend(st.session_state.security_properties)
-    cols.append("Rationale")
-
-    data_df = pd.DataFrame(columns=cols)
     query_results = [
         d for d in neo4j.find_item_elements(st.session_state.selected_item["item_name"])
-    ][:1]
+    ]
     st.session_state.system_elements = {
         n["node_id"]: {
             "element_name": n["node_name"],
@@ -60,165 +70,345 @@ def get_assets():
         )
         for result in query_results
     ]
-    tara_agent = TaraAgent()
-    llm_feedback_str = tara_agent.generate_response(
-        f"""Identify assets whithin the following list of elements {st.session_state.system_elements.values()} 
-        considering {st.session_state.system_relations} as the thir relationships and {st.session_state.security_properties} as security properties
-        """
+
+    # only elements changed since the last run go through the LLM again
+    st.session_state.previous_tara = incremental.TaraStore().load(
+        st.session_state.selected_item["item_handle"]
+    )
+    st.session_state.tara_inputs = {}
+    hashes = incremental.element_hashes(
+        st.session_state.system_elements,
+        st.session_state.system_relations,
+        st.session_state.security_properties,
+    )
+    elements = pd.DataFrame(
+        {
+            "Element Id": list(hashes),
+            "Element Name": [
+                st.session_state.system_elements[i]["element_name"] for i in hashes
+            ],
+            "Element Hash": list(hashes.values()),
+        }
+    )
+    # rows are keyed by the element handles, so equally named elements stay
+    # apart
+    kept, todo, st.session_state.tara_inputs["assets"] = incremental.split_rows(
+        elements, ["Element Id"], st.session_state.previous_tara.get("assets")
     )
+    if "assets" in st.session_state.previous_tara:
+        st.session_state.model_diff = incremental.diff(
+            st.session_state.previous_tara["assets"]["inputs"],
+            st.session_state.tara_inputs["assets"],
+        )
 
-    llm_feedback = ast.literal_eval(llm_feedback_str)["elements"]
+    data_df = incremental.attach_ids(
+        frames.asset_frame([], st.session_state.security_properties),
+        "Element Name",
+        [],
+        "Element Id",
+    )
+    if not todo.empty:
+        names = set(todo["Element Name"])
+        changed_elements = [
+            st.session_state.system_elements[i] for i in todo["Element Id"]
+        ]
+        changed_relations = [
+            r
+            for r in st.session_state.system_relations
+            if r["source_element"] in names or r["target_element"] in names
+        ]
+        tara_agent = TaraAgent()
+        placeholder, on_item = live_rows(
+            lambda items: frames.asset_frame(
+                items, st.session_state.security_properties
+            )
+        )
+        results, failed = tara_agent.identify_assets(
+            changed_elements,
+            changed_relations,
+            st.session_state.security_properties,
+            on_item=on_item,
+        )
+        placeholder.empty()
+        forget_failed(
+            "assets", todo[[e in failed for e in changed_elements]], ["Element Id"]
+        )
+        data_df = incremental.attach_ids(
+            frames.asset_frame(results.elements, st.session_state.security_properties),
+            "Element Name",
+            todo[["Element Id", "Element Name"]].itertuples(index=False),
+            "Element Id",
+        )
+    st.session_state.assets = incremental.merge_rows(kept, data_df)
 
-    for el in llm_feedback:
-        data_els = [el["name"], el["is_asset"]]
-        reason_str = "Asset: " + el["asset_reason"]
-        for p in st.session_state.security_properties:
-            p_l = p.lower().replace("-", "_")
-            data_els.append(el[p_l])
-            reason_str += "\n" + p + ": " + el[p_l + "_reason"]
-        data_els.append(reason_str)
 
-        data_df.loc[len(data_df.index)] = data_els
-    st.session_state.assets = data_df
+def previous_results(step):
+    return st.session_state.get("previous_tara", {}).get(step)
 
 
-def get_threats():
-    data_df = pd.DataFrame(
-        columns=[
-            "Asset Name",
-            "Threat Scenario",
-            "Affected Properties",
-        ]
-    )
-    tara_agent = TaraAgent()
-    llm_feedback = tara_agent.generate_response(
-        f"Specify cyber threat scenarios for each of the following assets {st.session_state.assets}."
+def forget_failed(step, failed, key):
+    """Leave rows the LLM failed on out of the stored input hashes, so that
+    the next run of the step analyses them again."""
+    for k in incremental.row_keys(failed, key):
+        st.session_state.tara_inputs[step].pop(k, None)
+    st.session_state.setdefault("failed_rows", {})[step] = failed
+
+
+def retry_failed(step):
+    """Re-run a step for its failed rows only, keeping all other results."""
+    st.session_state.previous_tara[step] = current_results()[step]
+    del st.session_state[step]
+    del st.session_state.failed_rows[step]
+
+
+def view_failed(step):
+    failed = st.session_state.get("failed_rows", {}).get(step)
+    if failed is not None and not failed.empty:
+        st.warning(f"The analysis failed for {len(failed.index)} rows.", icon="⚠️")
+        st.button(
+            "Retry failed rows", key=f"retry_{step}", on_click=retry_failed, args=(step,)
+        )
+
+
+def current_results():
+    """Results of this run, keeping those of the previous run for steps not
+    reached yet."""
+    results = dict(st.session_state.get("previous_tara", {}))
+    inputs = st.session_state.get("tara_inputs", {})
+    for step in incremental.STEPS:
+        if step in st.session_state and step in inputs:
+            results[step] = {
+                "rows": st.session_state[step],
+                "inputs": inputs[step],
+            }
+    return results
+
+
+def save_results():
+    incremental.TaraStore().save(
+        st.session_state.selected_item["item_handle"], current_results()
     )
 
-    llm_feedback = ast.literal_eval(llm_feedback)["scenarios"]
 
-    for el in llm_feedback:
-        data_df.loc[len(data_df.index)] = [
-            el["asset_name"],
-            el["scenario_description"],
-            el["affected_properties"],
-        ]
-    st.session_state.threats = data_df
+def save_run():
+    try:
+        version = TARANeo4j().save_run(
+            st.session_state.selected_item["item_handle"],
+            st.session_state.selected_item["tara_handle"],
+            current_results(),
+        )
+    except Exception as e:
+        st.error(f"Error: {e}\n{traceback.format_exc()}", icon="🚨")
+        return
+    st.session_state.saved_version = version
 
 
-def get_damages():
-    data_df = pd.DataFrame(
-        columns=[
-            "Asset Name",
-            "Threat Scenario",
-            "Damage Scenario",
-            "Safety Impact",
-            "Privacy Impact",
-            "Financial Impact",
-            "Operational Impact",
-            "Rationale",
+def restore_run(version):
+    """Load a stored run into the page in place of the current results."""
+    _, results = TARANeo4j().load_run(
+        st.session_state.selected_item["item_handle"], version
+    )
+    for step in incremental.STEPS:
+        if step in results:
+            st.session_state[step] = results[step]["rows"]
+        elif step in st.session_state:
+            del st.session_state[step]
+    if "attack_paths" in results:
+        st.session_state.attack_paths = feasibility.add_feasibility(
+            st.session_state.attack_paths
+        )
+    if "assets" in results:
+        st.session_state.security_properties = [
+            c
+            for c in results["assets"]["rows"].columns
+            if c not in ("Element Id", "Element Name", "Is Asset", "Rationale")
         ]
+    st.session_state.previous_tara = results
+    st.session_state.tara_inputs = {
+        step: result["inputs"] for step, result in results.items()
+    }
+    if "threats" in results:
+        threats_key = pipeline.rows_key(results["threats"]["rows"])
+        st.session_state.upstream_keys = {
+            step: threats_key
+            for step in pipeline.dependents("threats")
+            if step in results
+        }
+    # show every restored step without asking for approval again
+    for flag, key, step in [
+        ("assets_confirmed", "confirm_assets", "threats"),
+        ("threats_confirmed", "confirm_threats", "damages"),
+        ("damages_confirmed", "confirm_damages", "attack_paths"),
+    ]:
+        st.session_state[flag] = st.session_state[key] = step in results
+
+
+def view_history():
+    history = list(
+        TARANeo4j().run_history(st.session_state.selected_item["item_handle"])
+    )
+    if not history:
+        return
+    with st.expander("Saved TARA runs"):
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Version": [h["version"] for h in history],
+                    "Created": [h["created"] for h in history],
+                    **{
+                        step: [h["row_counts"].get(step, 0) for h in history]
+                        for step in incremental.STEPS
+                    },
+                }
+            ),
+            hide_index=True,
+        )
+        versions = [h["version"] for h in history]
+        col1, col2, _ = st.columns([1, 1, 2])
+        version = col1.selectbox("Version", versions, key="history_version")
+        col1.button("Restore", on_click=restore_run, args=(version,))
+        compare = col2.selectbox("Compare with", versions, key="history_compare")
+        if compare != version:
+            diff = TARANeo4j().diff_runs(
+                st.session_state.selected_item["item_handle"], compare, version
+            )
+            col2.dataframe(
+                pd.DataFrame(
+                    {
+                        "Step": list(diff),
+                        "Added": [len(d["added"].index) for d in diff.values()],
+                        "Removed": [len(d["removed"].index) for d in diff.values()],
+                    }
+                ),
+                hide_index=True,
+            )
+
+
+def get_threats():
+    data_df = frames.threat_frame([])
+    data_df.insert(0, "Asset Id", [])
+    # every element is a call of its own, so non-assets are left out
+    assets = st.session_state.assets
+    assets = assets[assets["Is Asset"].astype(str).str.lower() == "true"]
+    kept, todo, st.session_state.tara_inputs["threats"] = incremental.split_rows(
+        assets,
+        ["Element Id"],
+        previous_results("threats"),
+        ["Asset Id"],
     )
-    tara_agent = TaraAgent()
-    llm_feedback = tara_agent.generate_response(
-        f"Specify damage scenarios for each of the following threats {st.session_state.threats}."
+    if not todo.empty:
+        tara_agent = TaraAgent()
+        placeholder, on_item = live_rows(frames.threat_frame)
+        results, failed, asset_ids = tara_agent.specify_threats(todo, on_item=on_item)
+        placeholder.empty()
+        forget_failed("threats", failed, ["Element Id"])
+        data_df = frames.threat_frame(results.scenarios)
+        data_df.insert(0, "Asset Id", asset_ids)
+    st.session_state.threats = incremental.merge_rows(kept, data_df)
+
+
+def scheduler():
+    if "scheduler" not in st.session_state:
+        st.session_state.scheduler = pipeline.TaraScheduler()
+    return st.session_state.scheduler
+
+
+def graph_paths():
+    """Cheapest attack graph paths to every asset of the threats, kept until
+    the threats or the attack graph change."""
+    neo4j = SWNeo4j()
+    item_name = st.session_state.selected_item["item_name"]
+    key = (
+        pipeline.rows_key(st.session_state.threats),
+        neo4j.get_graph_snapshot(item_name).version,
     )
+    cached = st.session_state.get("graph_paths")
+    if cached is None or cached[0] != key:
+        previous = previous_results("attack_paths")
+        costs = pipeline.path_costs(previous and previous["rows"])
+        paths = {
+            asset: [
+                p["node_names"]
+                for p in neo4j.find_paths_to_asset(item_name, asset, node_costs=costs)
+            ]
+            for asset in st.session_state.threats["Asset Name"].unique()
+        }
+        cached = st.session_state.graph_paths = (key, paths)
+    return cached[1]
+
+
+def step_rows(step):
+    """Input rows of a step run on the threats."""
+    if step == "attack_paths":
+        return pipeline.with_graph_paths(st.session_state.threats, graph_paths())
+    return st.session_state.threats
+
+
+def get_threat_step(step):
+    """Rows of a step on the current threats, taken from the background job
+    started when the threats were confirmed, or generated now."""
+    previous = previous_results(step)
+    rows = step_rows(step)
+    result = scheduler().result(step, pipeline.inputs_key(rows, previous))
+    if result is None:
+        to_frame, _ = pipeline.THREAT_STEPS[step]
+        placeholder, on_item = live_rows(to_frame)
+        result = pipeline.run_threat_step(step, rows, previous, on_item)
+        placeholder.empty()
+    rows, st.session_state.tara_inputs[step], failed = result
+    forget_failed(step, failed, THREAT_KEY)
+    st.session_state.setdefault("upstream_keys", {})[step] = pipeline.rows_key(
+        st.session_state.threats
+    )
+    return rows
 
-    llm_feedback = ast.literal_eval(llm_feedback)["scenarios"]
-    for el in llm_feedback:
-        data_df.loc[len(data_df.index)] = [
-            el["asset_name"],
-            el["threat_scenario"],
-            el["damage_scenario"],
-            el["safety_impact"],
-            el["privacy_impact"],
-            el["financial_impact"],
-            el["operational_impact"],
-            "Safety: "
-            + el["safety_reason"]
-            + "\nPrivacy: "
-            + el["privacy_reason"]
-            + "\nFinancial: "
-            + el["fin_reason"]
-            + "\nOperational: "
-            + el["op_reason"],
-        ]
-    st.session_state.damages = data_df
+
+def invalidate_threat_steps():
+    """Drop the results of steps generated from other threats than the
+    current ones, so that they run again. Their results for unchanged
+    threats are reused, including the analyst's edits."""
+    threats_key = pipeline.rows_key(st.session_state.threats)
+    upstream_keys = st.session_state.get("upstream_keys", {})
+    for step in pipeline.dependents("threats"):
+        if step in st.session_state and upstream_keys.get(step) != threats_key:
+            st.session_state.previous_tara[step] = current_results()[step]
+            del st.session_state[step]
+
+
+def get_damages():
+    st.session_state.damages = get_threat_step("damages")
 
 
 def get_attack_paths():
-    data_df = pd.DataFrame(
-        columns=[
-            "Asset Name",
-            "Threat Scenario",
-            "Attack Path",
-            "Elapsed Time",
-            "Equipment",
-            "Knowledge",
-            "Expertise",
-            "Window of Opportunity",
-            "Rationale",
-        ]
-    )
-    tara_agent = TaraAgent()
-    llm_feedback = tara_agent.generate_response(
-        f"Specify worst-case attack paths for each of the following cyber threats {st.session_state.threats}."
+    st.session_state.attack_paths = feasibility.add_feasibility(
+        get_threat_step("attack_paths")
     )
 
-    llm_feedback = ast.literal_eval(llm_feedback)["paths"]
-
-    for el in llm_feedback:
-        data_df.loc[len(data_df.index)] = [
-            el["asset_name"],
-            el["threat_scenario"],
-            el["attack_path"],
-            el["elapsed_time"],
-            el["equipment"],
-            el["knowledge"],
-            el["expertise"],
-            el["window"],
-            "Elapsed Time: "
-            + el["elapsed_time_reason"]
-            + "\nEquipment: "
-            + el["equipment_reason"]
-            + "\nKnowledge: "
-            + el["knowledge_reason"]
-            + "\nExpertise: "
-            + el["expertise_reason"]
-            + "\nWindow: "
-            + el["window_reason"],
-        ]
-    st.session_state.attack_paths = data_df
-
 
 def get_goals():
-    data_df = pd.DataFrame(
-        columns=[
-            "Asset Name",
-            "Threat Scenario",
-            "Goal",
-            "Requirements",
-        ]
-    )
-    tara_agent = TaraAgent()
-    llm_feedback = tara_agent.generate_response(
-        f"Specify cyber security goals for reducing the risl of each of the following threats {st.session_state.threats}."
-    )
+    st.session_state.goals = get_threat_step("goals")
 
-    llm_feedback = ast.literal_eval(llm_feedback)["goals"]
 
-    for el in llm_feedback:
-        data_df.loc[len(data_df.index)] = [
-            el["asset_name"],
-            el["threat_scenario"],
-            el["goal"],
-            el["requirements"],
-        ]
-    st.session_state.goals = data_df
+def view_cache_stats():
+    llm_cache = utils.load_llm_cache()
+    if llm_cache:
+        stats = llm_cache.stats()
+        st.sidebar.caption(
+            f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries"
+        )
+
+
+def view_token_usage():
+    usage_frame = usage.frame()
+    if not usage_frame.empty:
+        with st.sidebar.expander("Token usage"):
+            st.dataframe(usage_frame.set_index("Chain").T)
 
 
 def render_page():
 
+    view_cache_stats()
+    view_token_usage()
     st.header("TARA Assistant")
     st.divider()
     col1, _ = st.columns(2)
@@ -244,6 +434,7 @@ def render_page():
     st.markdown("Pleae select an item definition from the list below.")
     st.session_state.selected_item = get_item()
     if st.session_state.selected_item:
+        view_history()
         st.subheader("2. Asset Identification")
 
         if "assets" not in st.session_state:
@@ -260,8 +451,16 @@ def render_page():
         st.markdown(
             "SystemExpert has come up with the following list of assets for the selected item.\nPlease make appropriate adjustments and approve the list to move to the next step."
         )
+        if "model_diff" in st.session_state:
+            model_diff = st.session_state.model_diff
+            st.caption(
+                f"Since the last run {len(model_diff['added'])} elements were added, "
+                f"{len(model_diff['changed'])} changed and {len(model_diff['removed'])} removed; "
+                "results of unchanged elements were carried over."
+            )
 
         st.session_state.assets = view_assets()
+        view_failed("assets")
 
         st.session_state.assets_confirmed = st.checkbox(
             "I approve the results and would like to go to the next step.",
@@ -288,6 +487,7 @@ def render_page():
                 "SystemExpert has come up with the following list of threat scenarios for the assets.\nPlease make appropriate adjustments and approve the list to move to the next step."
             )
             st.session_state.threats = view_threats()
+            view_failed("threats")
             st.session_state.threats_confirmed = st.checkbox(
                 "I approve the results and would like to go to the next step.",
                 value="threats_confirmed" in st.session_state
@@ -295,6 +495,16 @@ def render_page():
                 key="confirm_threats",
             )
             if st.session_state.threats_confirmed:
+                # damages, attack paths and goals only need the threats, so
+                # they are all generated in the background from here on, and
+                # again for the edited threats whenever the threats change
+                invalidate_threat_steps()
+                scheduler().prefetch(
+                    "threats",
+                    step_rows,
+                    previous_results,
+                    [s for s in incremental.STEPS if s in st.session_state],
+                )
 
                 st.subheader("4. Impact Analysis")
 
@@ -315,6 +525,17 @@ def render_page():
                     "SystemExpert has come up with the following list of damage scenarios for the assets.\nPlease make appropriate adjustments and approve the list to move to the next step."
                 )
                 st.session_state.damages = view_damages()
+                view_failed("damages")
+                st.markdown(
+                    "Impact propagated from the assets to the elements depending on them:"
+                )
+                item_name = st.session_state.selected_item["item_name"]
+                st.session_state.derived_impacts = propagation.derived_impact(
+                    SWNeo4j().get_graph_snapshot(item_name),
+                    st.session_state.damages,
+                    reachability=SWNeo4j().get_reachability_index(item_name),
+                )
+                st.dataframe(st.session_state.derived_impacts, hide_index=True)
                 st.session_state.damages_confirmed = st.checkbox(
                     "I approve the results and would like to go to the next step.",
                     value="damages_confirmed" in st.session_state
@@ -341,14 +562,28 @@ def render_page():
                     st.markdown(
                         "SystemExpert has come up with the following list of attack paths for the threat scenarios.\nPlease make appropriate adjustments and approve the list to move to the next step."
                     )
-                    st.session_state.attack_paths = view_attack_paths()
+                    # feasibility is recomputed for all rows after every edit
+                    st.session_state.attack_paths = feasibility.add_feasibility(
+                        view_attack_paths()
+                    )
+                    view_failed("attack_paths")
+                    st.session_state.asset_feasibility = (
+                        feasibility.asset_feasibility(st.session_state.attack_paths)
+                    )
+
+                    st.subheader("6. Risk Determination")
+                    # risk values follow every edit of the damages and paths
+                    st.session_state.risks = risk.determine_risk(
+                        st.session_state.damages, st.session_state.attack_paths
+                    )
+                    view_risks()
                     st.session_state.attack_paths_confirmed = st.checkbox(
                         "I approve the results and would like to go to the next step.",
                         value=False,
                         key="confirm_paths",
                     )
                     if st.session_state.attack_paths_confirmed:
-                        st.subheader("6. Goal Identification")
+                        st.subheader("7. Goal Identification")
 
                         if "goals" not in st.session_state:
 
@@ -368,16 +603,27 @@ def render_page():
                             "SystemExpert has come up with the following list of goals for the assets."
                         )
                         st.session_state.goals = view_goals()
+                        view_failed("goals")
                     elif "goals" in st.session_state:
                         del st.session_state.goals
                 elif "attack_paths" in st.session_state:
                     del st.session_state.attack_paths
-            elif "damages" in st.session_state:
-                del st.session_state.damages
+                    if "asset_feasibility" in st.session_state:
+                        del st.session_state.asset_feasibility
+                    if "risks" in st.session_state:
+                        del st.session_state.risks
+            else:
+                for step in pipeline.dependents("threats"):
+                    scheduler().cancel(step)
+                if "damages" in st.session_state:
+                    del st.session_state.damages
+                    if "derived_impacts" in st.session_state:
+                        del st.session_state.derived_impacts
         elif "threats" in st.session_state:
             del st.session_state.threats
         st.divider()
 
+        save_results()
         utils.save_as_pdf(st.session_state)
         st.markdown(
             """
@@ -393,7 +639,7 @@ def render_page():
             """,
             unsafe_allow_html=True,
         )
-        col1, col2 = st.columns([1, 1])
+        col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
             with open("report.pdf", "rb") as file:
                 st.download_button(
@@ -403,6 +649,11 @@ def render_page():
             if st.button("Export to SystemWeaver"):
 
                 st.switch_page("pages/7_SystemWeaver_Data_Exporter.py")
+        with col3:
+            st.button("Save to knowledge graph", on_click=save_run)
+        if "saved_version" in st.session_state:
+            st.success(f"Saved as version {st.session_state.saved_version}.")
+            del st.session_state.saved_version
 
     elif "assets" in st.session_state:
         del st.session_state.assets
@@ -432,12 +683,38 @@ def view_attack_paths():
             "Window of Opportunity": st.column_config.SelectboxColumn(
                 "Window of Opportunity", required=True, options=utils.WindowEnum.list()
             ),
+            "Attack Potential": st.column_config.NumberColumn(
+                "Attack Potential", disabled=True, format="%d"
+            ),
+            "Attack Feasibility": st.column_config.TextColumn(
+                "Attack Feasibility", disabled=True
+            ),
         },
         hide_index=True,
         # num_rows="dynamic",
     )
 
 
+def view_risks():
+    return st.dataframe(
+        st.session_state.risks[
+            [
+                "Asset Name",
+                "Threat Scenario",
+                "Damage Scenario",
+                "Impact",
+                "Attack Feasibility",
+                "Risk Value",
+                "CAL",
+            ]
+        ],
+        column_config={
+            "Risk Value": st.column_config.NumberColumn("Risk Value", format="%d"),
+        },
+        hide_index=True,
+    )
+
+
 def view_goals():
 
     return st.data_editor(
@@ -459,6 +736,7 @@ def view_threats():
     return st.data_editor(
         st.session_state.threats,
         column_config={
+            "Asset Id": None,
             "Asset Name": st.column_config.TextColumn("Asset Name", required=True),
             "Threat Scenario": st.column_config.TextColumn(
                 "Threat Scenario", required=True
@@ -501,6 +779,7 @@ def view_damages():
 
 def view_assets():
     config = {
+        "Element Id": None,
         "Element Name": st.column_config.TextColumn(
             "Element Name", required=True, help="Name of the element"
         ),
@@ -531,6 +810,8 @@ def item_changed():
     if "assets" in st.session_state:
         # if "selected_item" in st.session_state and option != st.session_state.selected_item["item_name"]:
         del st.session_state.assets
+    if "model_diff" in st.session_state:
+        del st.session_state.model_diff
 
 
 def get_item():
@@ -7,7 +7,8 @@ from streamlit.logger import get_logger
 
 from st_pages import add_page_title, add_indentation
 from adapters.neo4j_adapter import SWNeo4j
-from adapters.sw_adapter import SWREST, SWClient
+from adapters.sw_adapter import SWREST
+from adapters.sw_client import SWClient
 import traceback
 
 st.set_page_config("SystemWeaver Data Loader", page_icon=":copilot:",layout="wide")
@@ -52,24 +53,37 @@ def get_api_handle():
             
         )
     with col2:
-        handle = st.text_input("Item handle").split("/")[-1]
-    return option, handle
+        handles = st.text_area(
+            "Item handles", help="One item handle or item URL per line"
+        ).split()
+    return option, [handle.split("/")[-1] for handle in handles]
 
 
 
+def get_metamodel():
+    col1, _ = st.columns(2)
+    with col1:
+        metamodel = st.file_uploader(
+            "Metamodel (optional, adds the item type hierarchy as labels)",
+            type="xml",
+        )
+    return metamodel
+
+
 def render_page():
     st.session_state.default_port = st.secrets["SW_PORT"]
     st.header("SystemWeaver Data Loader")
     st.divider()
     st.subheader("Connect to SystemWeaver and load data into SystemExpert")
-    api, item_handle = get_api_handle()
+    api, item_handles = get_api_handle()
     if api == "REST API":
         st.session_state.default_port = st.secrets["SW_REST_PORT"]
     
     server, port = get_server()
 
     username, password = get_credentials()
-    
+
+    metamodel = get_metamodel()
     
     auth_data = {
         "username": username,
@@ -89,6 +103,10 @@ def render_page():
                 else:
                     sw_endpoint = SWClient(server, port)
                 sw_endpoint.authenticate(auth_data)
+                if metamodel:
+                    sw_endpoint.get_item_types(metamodel)
+                else:
+                    sw_endpoint.type_labels = {}
 
             except Exception as e:
                 st.error(f"Error: {e}\n{traceback.format_exc()}", icon="🚨")
@@ -96,10 +114,19 @@ def render_page():
         with st.spinner("Fetching data from SystemWeaver"):
             
             try:               
-
-                sw_items = sw_endpoint.import_data(item_handle)
-               
-
+                progress = st.empty()
+
+                def show_progress(root_counts, pending):
+                    progress.markdown(
+                        "\n".join(
+                            f"- {handle}: {count} items" for handle, count in root_counts.items()
+                        )
+                        + f"\n\n{pending} requests pending"
+                    )
+
+                sw_items = sw_endpoint.import_data(
+                    item_handles, on_progress=show_progress
+                )
 
             except Exception as e:
                 st.error(f"Error: {e}\n{traceback.format_exc()}", icon="🚨")
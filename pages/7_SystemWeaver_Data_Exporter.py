@@ -7,7 +7,8 @@ from streamlit.logger import get_logger
 
 from st_pages import add_page_title, add_indentation
 
-from adapters.sw_adapter import SWREST, SWClient
+from adapters.sw_adapter import SWREST
+from adapters.sw_client import SWClient
 import traceback
 
 st.set_page_config("SystemWeaver Data Exporter", page_icon=":copilot:",layout="wide")
@@ -102,6 +103,10 @@ def render_page():
                    
                     if "damages" in st.session_state:
                         data["damages"] = [(dmg["Asset Name"], dmg["Damage Scenario"], dmg["Safety Impact"], dmg["Privacy Impact"], dmg["Financial Impact"], dmg["Operational Impact"]) for ind, dmg in st.session_state.damages.iterrows()]
+                    if "attack_paths" in st.session_state:
+                        data["attack_paths"] = list(st.session_state.attack_paths[["Asset Name", "Threat Scenario", "Attack Path", "Attack Potential", "Attack Feasibility"]].itertuples(index=False, name=None))
+                    if "asset_feasibility" in st.session_state:
+                        data["feasibility"] = dict(zip(st.session_state.asset_feasibility["Asset Name"], st.session_state.asset_feasibility["Attack Feasibility"]))
 
                 sw_endpoint.export_data(data)
                 col1,_ = st.columns(2)
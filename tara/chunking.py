@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+from functools import cache
+import tiktoken
+from utils import llm_name
+
+CHARS_PER_TOKEN = 4
+
+
+@cache
+def encoding(model_name):
+    """tiktoken encoding of the model; models tiktoken does not know, such as
+    the Ollama ones, are counted with cl100k_base. None if the encoding
+    cannot be loaded, e.g. offline without a tiktoken cache."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text, model_name=llm_name):
+    """Token count of a text with the model's tokenizer, or about four
+    characters per token without one."""
+    enc = encoding(model_name)
+    if enc is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def prompt_columns(rows, columns=None):
+    """The given columns, or all but the Rationale and the element id."""
+    if columns is None:
+        return [c for c in rows.columns if c not in ("Rationale", "Element Id")]
+    return list(columns)
+
+
+def csv_line(values):
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerow(values)
+    return out.getvalue()
+
+
+def rows_text(rows, columns=None):
+    """Compact and lossless text of a DataFrame for prompts: CSV of the
+    columns a chain needs, without index, padding or truncation."""
+    columns = prompt_columns(rows, columns)
+    return rows.to_csv(index=False, columns=columns, lineterminator="\n")
+
+
+def chunk_rows(rows, columns, token_budget):
+    """Split rows into consecutive chunks whose rows_text fits into
+    token_budget; a row that does not fit on its own gets a chunk of its
+    own."""
+    columns = prompt_columns(rows, columns)
+    available = token_budget - count_tokens(csv_line(columns))
+    chunks = []
+    start, used = 0, 0
+    for ind, values in enumerate(rows[columns].itertuples(index=False)):
+        cost = count_tokens(csv_line(values))
+        if ind > start and used + cost > available:
+            chunks.append(rows.iloc[start:ind])
+            start, used = ind, 0
+        used += cost
+    if start < len(rows.index):
+        chunks.append(rows.iloc[start:])
+    return chunks
+
+
+def element_order(elements, relations):
+    """Element positions in depth-first order over the relations, so that an
+    element is directly followed by the elements it contains or connects."""
+    positions = {}
+    for ind, element in enumerate(elements):
+        positions.setdefault(element["element_name"], []).append(ind)
+    children = [[] for _ in elements]
+    has_parent = [False] * len(elements)
+    for rel in relations:
+        for source in positions.get(rel["source_element"], []):
+            for target in positions.get(rel["target_element"], []):
+                children[source].append(target)
+                has_parent[target] = True
+
+    order = []
+    seen = [False] * len(elements)
+    roots = [i for i in range(len(elements)) if not has_parent[i]]
+    for root in roots + list(range(len(elements))):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if seen[node]:
+                continue
+            seen[node] = True
+            order.append(node)
+            stack.extend(reversed(children[node]))
+    return order
+
+
+def chunk_elements(
+    elements, relations, token_budget, prompt_tokens=0, output_tokens_per_element=300
+):
+    """Split elements into chunks of neighbouring elements whose prompt and
+    expected answer fit into token_budget.
+
+    Each chunk is a pair of its elements and the relations touching them.
+    Every element costs its own tokens, those of the relations touching it
+    that the chunk does not send yet (as source or target) and
+    output_tokens_per_element for its share of the answer, so a chunk costs
+    exactly the relations it sends; an element that does not fit on its own
+    still gets a chunk of its own.
+    """
+    relation_tokens = [count_tokens(json.dumps(rel)) for rel in relations]
+    touching = {}
+    for ind, rel in enumerate(relations):
+        touching.setdefault(rel["source_element"], set()).add(ind)
+        touching.setdefault(rel["target_element"], set()).add(ind)
+    available = token_budget - prompt_tokens
+
+    def element_cost(element, sent):
+        new_relations = touching.get(element["element_name"], set()) - sent
+        cost = (
+            count_tokens(json.dumps(element))
+            + sum(relation_tokens[r] for r in new_relations)
+            + output_tokens_per_element
+        )
+        return cost, new_relations
+
+    chunks = []
+    current, sent, used = [], set(), 0
+    for ind in element_order(elements, relations):
+        element = elements[ind]
+        cost, new_relations = element_cost(element, sent)
+        if current and used + cost > available:
+            chunks.append(current)
+            current, sent, used = [], set(), 0
+            cost, new_relations = element_cost(element, sent)
+        current.append(element)
+        sent |= new_relations
+        used += cost
+    if current:
+        chunks.append(current)
+
+    result = []
+    for chunk in chunks:
+        names = {e["element_name"] for e in chunk}
+        result.append(
+            (
+                chunk,
+                [
+                    r
+                    for r in relations
+                    if r["source_element"] in names or r["target_element"] in names
+                ],
+            )
+        )
+    return result
+
+
+def merge_elements(outputs, elements):
+    """Elements of all per-chunk SWModelElements, ordered like the input
+    elements; elements the LLM added go last."""
+    order = {}
+    for ind, element in enumerate(elements):
+        order.setdefault(element["element_name"], ind)
+    merged = [el for output in outputs for el in output.elements]
+    merged.sort(key=lambda el: order.get(el.name, len(order)))
+    return merged
@@ -0,0 +1,84 @@
+from functools import cache
+import numpy as np
+import pandas as pd
+from utils import load_embedding_model
+
+
+@cache
+class ThreatClusterer:
+    """Groups near-duplicate threat scenarios so that only one scenario per
+    group goes through the damage, attack path and goal chains.
+
+    Scenarios are embedded in batches (each text once per process) and
+    clustered greedily: the first unassigned scenario becomes the
+    representative of every unassigned scenario whose cosine similarity to it
+    reaches the threshold. Only scenarios with the same values in the `by`
+    columns are grouped together.
+    """
+
+    def __init__(self, threshold=0.9, batch_size=64, by=("Affected Properties",)):
+        self.embeddings, _ = load_embedding_model()
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.by = list(by)
+        self.vectors = {}
+
+    def embed(self, texts):
+        """Unit-length embedding of every text."""
+        missing = list(dict.fromkeys(t for t in texts if t not in self.vectors))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            vectors = np.array(self.embeddings.embed_documents(batch), dtype=float)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            self.vectors.update(zip(batch, vectors))
+        return np.array([self.vectors[t] for t in texts]).reshape(len(texts), -1)
+
+    def cluster(self, threats):
+        """Return the threats with a Cluster column holding the position of
+        the representative scenario of each row."""
+        threats = threats.reset_index(drop=True)
+        vectors = self.embed(threats["Threat Scenario"].astype(str).tolist())
+        clusters = np.full(len(threats.index), -1)
+        groups = (
+            threats.groupby(self.by, sort=False, dropna=False).indices.values()
+            if self.by
+            else [np.arange(len(threats.index))]
+        )
+        for rows in groups:
+            rows = np.asarray(rows)
+            while rows.size:
+                representative = rows[0]
+                similar = vectors[rows] @ vectors[representative] >= self.threshold
+                similar[0] = True
+                clusters[rows[similar]] = representative
+                rows = rows[~similar]
+
+        threats["Cluster"] = clusters
+        return threats
+
+
+def representatives(clusters):
+    """One threat per cluster, without the Cluster column."""
+    rows = clusters[clusters["Cluster"] == clusters.index]
+    return rows.drop(columns="Cluster")
+
+
+def members(clusters, rows):
+    """All threats in the clusters of the given representative rows."""
+    return clusters[clusters["Cluster"].isin(rows.index)].drop(columns="Cluster")
+
+
+def fan_out(results, clusters):
+    """Copy the results of every representative threat to all members of its
+    cluster, under the member's asset and threat scenario."""
+    keys = ["Asset Name", "Threat Scenario"]
+    reps = clusters.loc[
+        clusters["Cluster"] == clusters.index, keys + ["Cluster"]
+    ].drop_duplicates(keys)
+    members = clusters[keys + ["Cluster"]]
+    matched = results.merge(reps, on=keys, how="left")
+    # results the LLM filed under a threat it was not given are kept as is
+    unmatched = results[matched["Cluster"].isna().to_numpy()]
+    fanned = matched.dropna(subset=["Cluster"]).drop(columns=keys)
+    fanned = fanned.merge(members, on="Cluster").drop(columns="Cluster")
+    return pd.concat([fanned[results.columns], unmatched], ignore_index=True)
@@ -0,0 +1,102 @@
+import numpy as np
+from utils import (
+    ElapsedTimeEnum,
+    EquipmentEnum,
+    ExpertiseEnum,
+    FeasibilityEnum,
+    KnowledgeEnum,
+    WindowEnum,
+)
+
+# Attack potential points per rating (ISO/SAE 21434 Annex G, attack
+# potential-based approach), keyed by the attack path DataFrame columns.
+ATTACK_POTENTIAL = {
+    "Elapsed Time": {
+        ElapsedTimeEnum.ONE_DAY: 0,
+        ElapsedTimeEnum.ONE_WEEK: 1,
+        ElapsedTimeEnum.ONE_MONTH: 4,
+        ElapsedTimeEnum.SIX_MONTHS: 17,
+        ElapsedTimeEnum.ABOVE_SIX_MONTHS: 19,
+    },
+    "Expertise": {
+        ExpertiseEnum.LAYMAN: 0,
+        ExpertiseEnum.PROFICIENT: 3,
+        ExpertiseEnum.EXPERT: 6,
+        ExpertiseEnum.MULTIPLE_EXPERTS: 8,
+    },
+    "Knowledge": {
+        KnowledgeEnum.PUBLIC: 0,
+        KnowledgeEnum.RESTRICTED: 3,
+        KnowledgeEnum.CONFIDENTIAL: 7,
+        KnowledgeEnum.STRICT: 11,
+    },
+    "Window of Opportunity": {
+        WindowEnum.UNLIMITED: 0,
+        WindowEnum.EASY: 1,
+        WindowEnum.MODERATE: 4,
+        WindowEnum.DIFFICULT: 10,
+    },
+    "Equipment": {
+        EquipmentEnum.STANDARD: 0,
+        EquipmentEnum.SPECIALIZED: 4,
+        EquipmentEnum.BESPOKE: 7,
+        EquipmentEnum.MULTI_BESPOKE: 9,
+    },
+}
+
+# upper bounds of the attack potential for each feasibility rating
+# (ISO/SAE 21434 Table G.9)
+FEASIBILITY_LEVELS = [
+    (9, FeasibilityEnum.HIGH),
+    (13, FeasibilityEnum.MEDIUM),
+    (19, FeasibilityEnum.LOW),
+    (np.inf, FeasibilityEnum.VERY_LOW),
+]
+
+
+def attack_potential(paths, ratings=ATTACK_POTENTIAL):
+    """Total attack potential of every row. Rows with a missing or unknown
+    rating get NaN."""
+    points = np.zeros(len(paths))
+    for column, values in ratings.items():
+        points += (
+            paths[column]
+            .astype("string")
+            .str.lower()
+            .map({str(rating): value for rating, value in values.items()})
+            .to_numpy(dtype=float, na_value=np.nan)
+        )
+    return points
+
+
+def feasibility_level(potential, levels=FEASIBILITY_LEVELS):
+    potential = np.asarray(potential, dtype=float)
+    bounds = np.array([bound for bound, _ in levels])
+    names = np.array([str(level) for _, level in levels] + [None], dtype=object)
+    index = np.searchsorted(bounds, potential, side="left")
+    index[np.isnan(potential)] = len(levels)
+    return names[index]
+
+
+def add_feasibility(paths, ratings=ATTACK_POTENTIAL, levels=FEASIBILITY_LEVELS):
+    """Return the attack path DataFrame with Attack Potential and Attack
+    Feasibility columns computed for all rows at once."""
+    paths = paths.copy()
+    potential = attack_potential(paths, ratings)
+    paths["Attack Potential"] = potential
+    paths["Attack Feasibility"] = feasibility_level(potential, levels)
+    return paths
+
+
+def asset_feasibility(paths, by="Asset Name", levels=FEASIBILITY_LEVELS):
+    """Feasibility per asset: the easiest path, i.e. the minimum attack
+    potential over all paths of the asset, decides."""
+    if "Attack Potential" not in paths:
+        paths = add_feasibility(paths, levels=levels)
+    per_asset = (
+        paths.groupby(by, sort=False)["Attack Potential"].min().reset_index()
+    )
+    per_asset["Attack Feasibility"] = feasibility_level(
+        per_asset["Attack Potential"], levels
+    )
+    return per_asset
@@ -0,0 +1,104 @@
+import pandas as pd
+
+
+def property_field(security_property):
+    """Field name of a security property in SWModelEleemnt."""
+    return security_property.lower().replace("-", "_")
+
+
+def rationale(items, reasons):
+    """One rationale string per item from its (label, field) reasons."""
+    return [
+        "\n".join(label + ": " + getattr(item, field) for label, field in reasons)
+        for item in items
+    ]
+
+
+def asset_frame(elements, security_properties):
+    """Asset identification table of a list of SWModelEleemnt."""
+    fields = [property_field(p) for p in security_properties]
+    data = {
+        "Element Name": [el.name for el in elements],
+        "Is Asset": [el.is_asset for el in elements],
+    }
+    for p, field in zip(security_properties, fields):
+        data[p] = [getattr(el, field) for el in elements]
+    data["Rationale"] = rationale(
+        elements,
+        [("Asset", "asset_reason")]
+        + [(p, field + "_reason") for p, field in zip(security_properties, fields)],
+    )
+    return pd.DataFrame(data)
+
+
+def threat_frame(scenarios):
+    """Threat scenario table of a list of ThreatScenario."""
+    return pd.DataFrame(
+        {
+            "Asset Name": [s.asset_name for s in scenarios],
+            "Threat Scenario": [s.scenario_description for s in scenarios],
+            "Affected Properties": [s.affected_properties for s in scenarios],
+        }
+    )
+
+
+def damage_frame(scenarios):
+    """Damage scenario table of a list of DamageScenario."""
+    return pd.DataFrame(
+        {
+            "Asset Name": [s.asset_name for s in scenarios],
+            "Threat Scenario": [s.threat_scenario for s in scenarios],
+            "Damage Scenario": [s.damage_scenario for s in scenarios],
+            "Safety Impact": [s.safety_impact for s in scenarios],
+            "Privacy Impact": [s.privacy_impact for s in scenarios],
+            "Financial Impact": [s.financial_impact for s in scenarios],
+            "Operational Impact": [s.operational_impact for s in scenarios],
+            "Rationale": rationale(
+                scenarios,
+                [
+                    ("Safety", "safety_reason"),
+                    ("Privacy", "privacy_reason"),
+                    ("Financial", "fin_reason"),
+                    ("Operational", "op_reason"),
+                ],
+            ),
+        }
+    )
+
+
+def attack_path_frame(paths):
+    """Attack path table of a list of AttackPath."""
+    return pd.DataFrame(
+        {
+            "Asset Name": [p.asset_name for p in paths],
+            "Threat Scenario": [p.threat_scenario for p in paths],
+            "Attack Path": [p.attack_path for p in paths],
+            "Elapsed Time": [p.elapsed_time for p in paths],
+            "Equipment": [p.equipment for p in paths],
+            "Knowledge": [p.knowledge for p in paths],
+            "Expertise": [p.expertise for p in paths],
+            "Window of Opportunity": [p.window for p in paths],
+            "Rationale": rationale(
+                paths,
+                [
+                    ("Elapsed Time", "elapsed_time_reason"),
+                    ("Equipment", "equipment_reason"),
+                    ("Knowledge", "knowledge_reason"),
+                    ("Expertise", "expertise_reason"),
+                    ("Window", "window_reason"),
+                ],
+            ),
+        }
+    )
+
+
+def goal_frame(goals):
+    """Goal table of a list of Goal."""
+    return pd.DataFrame(
+        {
+            "Asset Name": [g.asset_name for g in goals],
+            "Threat Scenario": [g.threat_scenario for g in goals],
+            "Goal": [g.goal for g in goals],
+            "Requirements": [g.requirements for g in goals],
+        }
+    )
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+STEPS = ["assets", "threats", "damages", "attack_paths", "goals"]
+
+
+def content_hash(value):
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def element_hashes(elements, relations, security_properties):
+    """Content hash per element object_id over its name, description, the
+    relations it takes part in and the security properties of the TARA."""
+    touching = {}
+    for rel in relations:
+        rel_key = (rel["source_element"], rel["relation_type"], rel["target_element"])
+        for name in (rel["source_element"], rel["target_element"]):
+            touching.setdefault(name, set()).add(rel_key)
+    properties = sorted(security_properties)
+    return {
+        object_id: content_hash(
+            [
+                element["element_name"],
+                element["element_description"],
+                sorted(touching.get(element["element_name"], ())),
+                properties,
+            ]
+        )
+        for object_id, element in elements.items()
+    }
+
+
+def diff(old_hashes, new_hashes):
+    """Keys added, removed, changed and unchanged between two sets of hashes."""
+    old, new = set(old_hashes), set(new_hashes)
+    common = old & new
+    changed = {i for i in common if old_hashes[i] != new_hashes[i]}
+    return {
+        "added": new - old,
+        "removed": old - new,
+        "changed": changed,
+        "unchanged": common - changed,
+    }
+
+
+def row_keys(rows, columns):
+    return [json.dumps(key) for key in rows[columns].astype(str).values.tolist()]
+
+
+def row_hashes(rows, key_columns):
+    """Content hash of the input rows of a step, per key."""
+    hashes = {}
+    records = rows.astype(str).to_dict("records")
+    for key, record in zip(row_keys(rows, key_columns), records):
+        hashes[key] = content_hash([hashes.get(key), record])
+    return hashes
+
+
+def split_rows(inputs, input_key, previous, key=None):
+    """Split the input rows of a step into rows whose results carry over from
+    the previous run and rows that have to go through the LLM again.
+
+    previous holds the result rows of the step and the hashes of the input
+    rows they were generated from; key names the result columns matching
+    input_key. Returns the carried over result rows, the input rows to
+    analyse and the hashes of all input rows.
+    """
+    key = key or input_key
+    hashes = row_hashes(inputs, input_key)
+    # results stored before the key columns existed are not reused
+    if not previous or not set(key) <= set(previous["rows"].columns):
+        return None, inputs, hashes
+    # an unchanged input row is done even if it produced no results
+    clean = {k for k, h in hashes.items() if previous["inputs"].get(k) == h}
+    rows = previous["rows"]
+    kept = rows[[k in clean for k in row_keys(rows, key)]]
+    todo = inputs[[k not in clean for k in row_keys(inputs, input_key)]]
+    return kept, todo, hashes
+
+
+def attach_ids(rows, name_column, elements, id_column):
+    """Insert the id of the element every row was generated for as first
+    column, matching rows to the (id, name) elements by name. Rows sharing a
+    name take the ids of the equally named elements in order; rows of names
+    the elements do not have get None."""
+    ids = {}
+    for element_id, name in elements:
+        ids.setdefault(name, []).append(element_id)
+    position = {}
+    row_ids = []
+    for name in rows[name_column]:
+        candidates = ids.get(name, [])
+        ind = position.get(name, 0)
+        row_ids.append(candidates[ind] if ind < len(candidates) else None)
+        position[name] = ind + 1
+    rows = rows.copy()
+    rows.insert(0, id_column, row_ids)
+    return rows
+
+
+def merge_rows(kept, rows):
+    if kept is None or kept.empty:
+        return rows
+    if rows.empty:
+        return kept.reset_index(drop=True)
+    return pd.concat([kept, rows], ignore_index=True)
+
+
+def serialize_rows(rows):
+    """Columns and JSON-safe row values of a result DataFrame."""
+    rows = rows.astype(object)
+    return list(rows.columns), rows.where(rows.notna(), None).values.tolist()
+
+
+class TaraStore:
+    """TARA results of the last run of every item, one JSON file per item
+    handle. Every step keeps its rows and the hashes of the input rows they
+    were generated from."""
+
+    def __init__(self, path="./tara_cache") -> None:
+        self.path = path
+
+    def file_path(self, item_handle):
+        return os.path.join(self.path, f"{item_handle}.json")
+
+    def load(self, item_handle):
+        try:
+            with open(self.file_path(item_handle)) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        return {
+            step: {
+                "rows": pd.DataFrame(result["data"], columns=result["columns"]),
+                "inputs": result["inputs"],
+            }
+            for step, result in data.items()
+        }
+
+    def save(self, item_handle, results):
+        os.makedirs(self.path, exist_ok=True)
+        data = {}
+        for step, result in results.items():
+            columns, rows = serialize_rows(result["rows"])
+            data[step] = {"columns": columns, "data": rows, "inputs": result["inputs"]}
+        path = self.file_path(item_handle)
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f, default=str)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from llm.tara_agent import TaraAgent
+from tara import clustering, feasibility, frames, incremental
+
+# the steps each TARA step takes its input rows from
+DEPENDENCIES = {
+    "assets": [],
+    "threats": ["assets"],
+    "damages": ["threats"],
+    "attack_paths": ["threats"],
+    "goals": ["threats"],
+}
+
+THREAT_KEY = ["Asset Name", "Threat Scenario"]
+
+# table builder and result list field of the steps run per threat
+THREAT_STEPS = {
+    "damages": (frames.damage_frame, "scenarios"),
+    "attack_paths": (frames.attack_path_frame, "paths"),
+    "goals": (frames.goal_frame, "goals"),
+}
+
+
+def dependents(step, dependencies=DEPENDENCIES):
+    """Steps that only need the rows of the given step."""
+    return [s for s, deps in dependencies.items() if deps == [step]]
+
+
+def rows_key(rows):
+    """Hash of the rows of a step."""
+    return incremental.content_hash(incremental.serialize_rows(rows))
+
+
+def inputs_key(rows, previous):
+    """Hash of the input rows of a step and the previous results it reuses."""
+    return incremental.content_hash(
+        [rows_key(rows), previous and previous["inputs"]]
+    )
+
+
+def path_costs(attack_paths):
+    """Cost of every asset on a graph path: one plus the attack potential of
+    its easiest attack path in earlier attack path rows, so that paths
+    through hard to attack assets come last."""
+    if attack_paths is None or attack_paths.empty:
+        return {}
+    per_asset = feasibility.asset_feasibility(attack_paths).dropna()
+    return dict(
+        zip(per_asset["Asset Name"], per_asset["Attack Potential"] + 1)
+    )
+
+
+def with_graph_paths(threats, paths):
+    """Threat rows with the cheapest paths to their asset through the item's
+    attack graph, given per asset name as node name lists, as a Graph Paths
+    column the attack path step gets as a starting point."""
+    threats = threats.copy()
+    threats["Graph Paths"] = (
+        threats["Asset Name"]
+        .map({asset: "; ".join(" -> ".join(p) for p in ps) for asset, ps in paths.items()})
+        .fillna("")
+    )
+    return threats
+
+
+def run_threat_step(step, threats, previous, on_item=None):
+    """Run a step on the threats without previous results and return its
+    rows, its input hashes and the threats it failed on.
+
+    Near-duplicate threats share the results of one representative; a failed
+    representative leaves its whole cluster without results.
+    """
+    to_frame, field = THREAT_STEPS[step]
+    kept, todo, inputs = incremental.split_rows(threats, THREAT_KEY, previous, THREAT_KEY)
+    rows = to_frame([])
+    failed = todo.iloc[0:0]
+    if not todo.empty:
+        clusters = clustering.ThreatClusterer().cluster(todo)
+        results, failed = TaraAgent().run_step(
+            step, clustering.representatives(clusters), on_item=on_item
+        )
+        failed = clustering.members(clusters, failed)
+        rows = clustering.fan_out(to_frame(getattr(results, field)), clusters)
+    return incremental.merge_rows(kept, rows), inputs, failed
+
+
+class TaraScheduler:
+    """Runs TARA steps in background threads as soon as their input rows are
+    known, so that independent steps are generated concurrently.
+
+    There is one job per step, keyed by the hash of its inputs. Submitting a
+    step again with other inputs cancels the old job; a job that is already
+    running cannot be stopped, so it finishes and its result is dropped.
+    """
+
+    def __init__(self, max_workers=3) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = {}
+
+    def submit(self, step, key, func, *args):
+        job = self.jobs.get(step)
+        if job is not None:
+            if job[0] == key:
+                return job[1]
+            job[1].cancel()
+        future = self.executor.submit(func, *args)
+        self.jobs[step] = (key, future)
+        return future
+
+    def cancel(self, step):
+        job = self.jobs.pop(step, None)
+        if job is not None:
+            job[1].cancel()
+
+    def result(self, step, key):
+        """Result of the job for step if it was run on the inputs with the
+        given key, waiting for it to finish; None without such a job. Errors
+        of the job are raised here."""
+        job = self.jobs.pop(step, None)
+        if job is None:
+            return None
+        if job[0] != key:
+            job[1].cancel()
+            return None
+        return job[1].result()
+
+    def prefetch(self, step, rows, previous, done=()):
+        """Start every step that only depends on the given step's rows,
+        except those done already. rows(step) gives the input rows of a
+        step and previous(step) the previous results it may reuse."""
+        todo = [s for s in dependents(step) if s in THREAT_STEPS and s not in done]
+        if not todo:
+            return
+        # built here, as the cached instances are not created thread-safely
+        TaraAgent()
+        clustering.ThreatClusterer()
+        for dependent in todo:
+            self.submit(
+                dependent,
+                inputs_key(rows(dependent), previous(dependent)),
+                run_threat_step,
+                dependent,
+                rows(dependent),
+                previous(dependent),
+            )
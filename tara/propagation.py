@@ -0,0 +1,118 @@
+import heapq
+import numpy as np
+import pandas as pd
+from graph.reachability import strongly_connected_components
+from tara.risk import IMPACT_COLUMNS, IMPACT_ORDER, level_codes
+
+# How impact spreads over the system-model relations of an item: the
+# direction relative to the stored edge ("forward", "reverse" or "both") and
+# the number of impact levels lost per hop. A compromised subcomponent
+# affects the component that contains it, a compromised component or medium
+# affects everything attached to the same medium.
+PROPAGATION_RULES = {
+    "Subcomponent": ("reverse", 0),
+    "System_Component": ("reverse", 1),
+    "Communication_Medium": ("both", 1),
+}
+
+
+def propagation_edges(snapshot, rules=PROPAGATION_RULES):
+    """Successor lists over compact node ids with the attenuation of every
+    edge, following the direction given by the rules."""
+    successors = [[] for _ in snapshot.node_ids]
+    attenuation = [[] for _ in snapshot.node_ids]
+    for rel_type, (direction, levels) in rules.items():
+        sources, targets = snapshot.edges(rel_type)
+        for source, target in zip(sources.tolist(), targets.tolist()):
+            if direction in ("forward", "both"):
+                successors[source].append(target)
+                attenuation[source].append(levels)
+            if direction in ("reverse", "both"):
+                successors[target].append(source)
+                attenuation[target].append(levels)
+    return successors, attenuation
+
+
+def propagate(snapshot, levels, rules=PROPAGATION_RULES):
+    """Push worst-case impact levels along the dependency edges.
+
+    levels holds one row of ordinal impact codes per snapshot node (-1 where
+    unrated). Strongly connected components are condensed and visited once in
+    topological order, so every edge between components is followed once.
+    Inside a cycle levels spread member to member, highest level first.
+    """
+    successors, attenuation = propagation_edges(snapshot, rules)
+    components, component_count = strongly_connected_components(successors)
+    members = [[] for _ in range(component_count)]
+    for node, component in enumerate(components):
+        members[component].append(node)
+
+    derived = np.asarray(levels, dtype=np.int64).tolist()
+    # components are numbered in reverse topological order, so everything
+    # flowing into a component has arrived by the time it is visited
+    for component in range(component_count - 1, -1, -1):
+        nodes = members[component]
+        if len(nodes) > 1:
+            relax_component(nodes, component, components, successors, attenuation, derived)
+        for node in nodes:
+            for target, loss in zip(successors[node], attenuation[node]):
+                if components[target] == component:
+                    continue
+                row = derived[target]
+                for ind, level in enumerate(derived[node]):
+                    if level - loss > row[ind]:
+                        row[ind] = level - loss
+    return np.array(derived, dtype=np.int64).reshape(np.shape(levels))
+
+
+def relax_component(nodes, component, components, successors, attenuation, derived):
+    """Spread levels between the members of one strongly connected component,
+    highest level first, losing the attenuation on every hop."""
+    for ind in range(len(derived[nodes[0]])):
+        heap = [(-derived[node][ind], node) for node in nodes if derived[node][ind] >= 0]
+        heapq.heapify(heap)
+        while heap:
+            level, node = heapq.heappop(heap)
+            level = -level
+            if level < derived[node][ind]:
+                continue
+            for target, loss in zip(successors[node], attenuation[node]):
+                if components[target] == component and level - loss > derived[target][ind]:
+                    derived[target][ind] = level - loss
+                    heapq.heappush(heap, (loss - level, target))
+
+
+def derived_impact(snapshot, damages, rules=PROPAGATION_RULES, reachability=None):
+    """Impact of every element of the item once the impact of the damage
+    scenarios has spread from the assets to the elements depending on them.
+    Assets are matched to graph nodes by name. With the item's reachability
+    index, the number of entry points an attacker can reach every element
+    from is added as Entry Points."""
+    codes = np.column_stack(
+        [level_codes(damages[column], IMPACT_ORDER) for column in IMPACT_COLUMNS]
+    )
+    per_asset = (
+        pd.DataFrame(codes, columns=IMPACT_COLUMNS)
+        .groupby(damages["Asset Name"].to_numpy())
+        .max()
+    )
+
+    levels = np.full((len(snapshot.node_ids), len(IMPACT_COLUMNS)), -1)
+    names = pd.Series(snapshot.names)
+    rated = names.isin(per_asset.index).to_numpy()
+    levels[rated] = per_asset.loc[names[rated]].to_numpy()
+
+    derived = propagate(snapshot, levels, rules)
+    affected = derived.max(axis=1) >= 0
+    level_names = np.array(IMPACT_ORDER + [None], dtype=object)
+    result = pd.DataFrame({"Element Name": names[affected].to_numpy()})
+    for ind, column in enumerate(IMPACT_COLUMNS):
+        result["Derived " + column] = level_names[derived[affected, ind]]
+    result["Derived Impact"] = level_names[derived[affected].max(axis=1)]
+    result["Is Asset"] = rated[affected]
+    if reachability is not None:
+        result["Entry Points"] = [
+            len(reachability.entry_points_for(node_id))
+            for node_id in np.array(snapshot.node_ids, dtype=object)[affected]
+        ]
+    return result
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from utils import FeasibilityEnum, ImpactEnum
+from tara.feasibility import add_feasibility, feasibility_level
+
+IMPACT_COLUMNS = [
+    "Safety Impact",
+    "Privacy Impact",
+    "Financial Impact",
+    "Operational Impact",
+]
+IMPACT_ORDER = ImpactEnum.list()  # negligible .. severe
+FEASIBILITY_ORDER = FeasibilityEnum.list()[::-1]  # very low .. high
+
+# Risk values indexed by [impact, feasibility] in the order above
+# (ISO/SAE 21434 Annex H example risk matrix).
+RISK_MATRIX = np.array(
+    [
+        [1, 1, 1, 1],  # negligible
+        [1, 2, 2, 3],  # moderate
+        [1, 2, 3, 4],  # major
+        [2, 3, 4, 5],  # severe
+    ]
+)
+
+# CAL indexed by [impact, feasibility]. Annex E determines the CAL from impact
+# and attack vector; attack feasibility stands in for the attack vector here
+# (very low ~ physical, low ~ local, medium ~ adjacent, high ~ network).
+CAL_TABLE = np.array(
+    [
+        [None, None, None, None],  # negligible
+        ["CAL1", "CAL1", "CAL2", "CAL3"],  # moderate
+        ["CAL1", "CAL2", "CAL3", "CAL4"],  # major
+        ["CAL2", "CAL3", "CAL4", "CAL4"],  # severe
+    ],
+    dtype=object,
+)
+
+
+def level_codes(values, levels):
+    """Ordinal code of every value, -1 for missing or unknown values."""
+    return pd.Categorical(
+        pd.Series(values).astype("string").str.lower(),
+        categories=[str(level) for level in levels],
+    ).codes
+
+
+def lookup(table, impact_codes, feasibility_codes):
+    """Vectorised table lookup; rows with an unknown code get None."""
+    valid = (impact_codes >= 0) & (feasibility_codes >= 0)
+    result = np.full(len(impact_codes), None, dtype=object)
+    result[valid] = table[impact_codes[valid], feasibility_codes[valid]]
+    return result
+
+
+def determine_risk(
+    damages, attack_paths, risk_matrix=RISK_MATRIX, cal_table=CAL_TABLE
+):
+    """Join damage scenarios with attack paths on asset and threat scenario
+    and compute the risk value and CAL of every damage scenario.
+
+    The impact of a damage scenario is its worst impact over the four
+    categories and the feasibility of a threat scenario is that of its most
+    feasible attack path.
+    """
+    keys = ["Asset Name", "Threat Scenario"]
+    if "Attack Potential" not in attack_paths:
+        attack_paths = add_feasibility(attack_paths)
+    threat_feasibility = (
+        attack_paths.groupby(keys, sort=False)["Attack Potential"].min().reset_index()
+    )
+
+    risks = damages.merge(threat_feasibility, on=keys, how="left")
+    impact_codes = np.max(
+        np.column_stack(
+            [level_codes(risks[column], IMPACT_ORDER) for column in IMPACT_COLUMNS]
+        ),
+        axis=1,
+    )
+    feasibility = feasibility_level(risks["Attack Potential"])
+    feasibility_codes = level_codes(feasibility, FEASIBILITY_ORDER)
+
+    risks["Impact"] = np.array(IMPACT_ORDER + [None], dtype=object)[impact_codes]
+    risks["Attack Feasibility"] = feasibility
+    risks["Risk Value"] = lookup(risk_matrix, impact_codes, feasibility_codes)
+    risks["CAL"] = lookup(cal_table, impact_codes, feasibility_codes)
+    return risks
@@ -0,0 +1,58 @@
+import pytest
+from langchain_core.outputs import Generation
+from llm import cache
+from llm.cache import SQLiteResponseCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock.time)
+    return clock
+
+
+def answer(text):
+    return [Generation(text=text)]
+
+
+def test_hit_ignores_whitespace(tmp_path, clock):
+    responses = SQLiteResponseCache(str(tmp_path / "cache.sqlite"))
+    responses.update("a  prompt\n", "model", answer("yes"))
+    assert responses.lookup("a prompt", "model")[0].text == "yes"
+    assert responses.lookup("a prompt", "other model") is None
+    assert responses.stats()["hits"] == 1
+    assert responses.stats()["misses"] == 1
+
+
+def test_expired_entries_are_removed(tmp_path, clock):
+    responses = SQLiteResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+    responses.update("prompt", "model", answer("yes"))
+    clock.now += 59
+    assert responses.lookup("prompt", "model") is not None
+    clock.now += 2
+    assert responses.lookup("prompt", "model") is None
+    assert responses.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    responses = SQLiteResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    responses.update("first", "model", answer("1"))
+    clock.now += 1
+    responses.update("second", "model", answer("2"))
+    clock.now += 1
+    # reading the first entry makes the second the least recently used
+    assert responses.lookup("first", "model") is not None
+    clock.now += 1
+    responses.update("third", "model", answer("3"))
+    assert responses.stats()["entries"] == 2
+    assert responses.lookup("second", "model") is None
+    assert responses.lookup("first", "model") is not None
+    assert responses.lookup("third", "model") is not None
@@ -0,0 +1,78 @@
+from typing import List
+import pandas as pd
+from langchain_core.pydantic_v1 import BaseModel
+from langchain_core.runnables import RunnableLambda
+from llm.fanout import FanOutChain
+
+
+class Scenario(BaseModel):
+    asset_name: str
+
+
+class Scenarios(BaseModel):
+    scenarios: List[Scenario]
+
+
+ROWS = pd.DataFrame(
+    {
+        "Element Id": ["e1", "e2", "e3"],
+        "Element Name": ["Gateway", "Broken", "Gateway"],
+    }
+)
+
+
+def answer(text):
+    """One scenario per row of the CSV input."""
+    names = text["input"].strip().split("\n")[1:]
+    return {"scenarios": [{"asset_name": name} for name in names]}
+
+
+def fan_out(chain, retries=2):
+    return FanOutChain(
+        RunnableLambda(chain), Scenarios, "scenarios", retries=retries, retry_delay=0
+    )
+
+
+def test_failing_groups_are_returned_after_their_retries():
+    calls = []
+
+    def chain(text):
+        calls.append(text["input"])
+        if "Broken" in text["input"]:
+            raise ValueError("no answer")
+        return answer(text)
+
+    results, failed = fan_out(chain).run(ROWS, ["Element Id"])
+    assert [s.asset_name for s in results.scenarios] == ["Gateway", "Gateway"]
+    assert failed["Element Id"].tolist() == ["e2"]
+    # the failing group was sent once and retried twice, the others once
+    assert sum("Broken" in c for c in calls) == 3
+    assert len(calls) == 5
+
+
+def test_retry_recovers_a_group():
+    attempts = []
+
+    def chain(text):
+        attempts.append(text["input"])
+        if "Broken" in text["input"] and attempts.count(text["input"]) == 1:
+            return {"scenarios": [{"name": "invalid"}]}
+        return answer(text)
+
+    results, failed = fan_out(chain).run(ROWS, ["Element Id"])
+    assert failed.empty
+    assert len(results.scenarios) == 3
+
+
+def test_tags_name_the_group_of_every_item():
+    def chain(text):
+        if "Broken" in text["input"]:
+            raise ValueError("no answer")
+        return answer(text)
+
+    results, failed, tags = fan_out(chain, retries=0).run_tagged(
+        ROWS, ["Element Id"], "Element Id"
+    )
+    assert tags == ["e1", "e3"]
+    assert len(results.scenarios) == len(tags)
+    assert failed["Element Id"].tolist() == ["e2"]
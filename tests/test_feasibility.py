@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from tara.feasibility import add_feasibility, asset_feasibility, feasibility_level
+
+
+def paths(**ratings):
+    rows = {
+        "Asset Name": ["ECU"],
+        "Threat Scenario": ["Spoofing"],
+        "Elapsed Time": ["up to one day"],
+        "Expertise": ["layman"],
+        "Knowledge": ["public information"],
+        "Window of Opportunity": ["unlimited"],
+        "Equipment": ["standard"],
+    }
+    rows.update({column: [value] for column, value in ratings.items()})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize(
+    "potential, level",
+    [
+        (0, "high"),
+        (9, "high"),
+        (10, "medium"),
+        (13, "medium"),
+        (14, "low"),
+        (19, "low"),
+        (20, "very low"),
+        (54, "very low"),
+    ],
+)
+def test_feasibility_bands(potential, level):
+    assert list(feasibility_level([potential])) == [level]
+
+
+def test_unknown_rating_has_no_feasibility():
+    assert list(feasibility_level([np.nan])) == [None]
+    rated = add_feasibility(paths(Equipment="a soldering iron"))
+    assert np.isnan(rated["Attack Potential"][0])
+    assert rated["Attack Feasibility"][0] is None
+
+
+def test_attack_potential_sums_the_ratings():
+    rated = add_feasibility(
+        paths(
+            **{
+                "Elapsed Time": "up to one month",
+                "Expertise": "Expert",
+                "Knowledge": "restricted information",
+                "Window of Opportunity": "easy",
+                "Equipment": "specialized",
+            }
+        )
+    )
+    assert rated["Attack Potential"][0] == 4 + 6 + 3 + 1 + 4
+    assert rated["Attack Feasibility"][0] == "low"
+
+
+def test_easiest_path_decides_per_asset():
+    both = pd.concat(
+        [paths(Expertise="multiple experts"), paths()], ignore_index=True
+    )
+    per_asset = asset_feasibility(both)
+    assert per_asset["Attack Potential"].tolist() == [0]
+    assert per_asset["Attack Feasibility"].tolist() == ["high"]
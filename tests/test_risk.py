@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from tara.risk import determine_risk
+
+
+def paths(**ratings):
+    rows = {
+        "Asset Name": ["ECU"],
+        "Threat Scenario": ["Spoofing"],
+        "Elapsed Time": ["up to one day"],
+        "Expertise": ["layman"],
+        "Knowledge": ["public information"],
+        "Window of Opportunity": ["unlimited"],
+        "Equipment": ["standard"],
+    }
+    rows.update({column: [value] for column, value in ratings.items()})
+    return pd.DataFrame(rows)
+
+
+def damages(**impacts):
+    rows = {
+        "Asset Name": ["ECU"],
+        "Threat Scenario": ["Spoofing"],
+        "Damage Scenario": ["Loss of braking"],
+        "Safety Impact": ["negligible"],
+        "Privacy Impact": ["negligible"],
+        "Financial Impact": ["negligible"],
+        "Operational Impact": ["negligible"],
+    }
+    rows.update({column: [value] for column, value in impacts.items()})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize(
+    "impact, ratings, risk, cal",
+    [
+        ("severe", {}, 5, "CAL4"),
+        ("major", {}, 4, "CAL4"),
+        ("moderate", {"Expertise": "multiple experts", "Equipment": "bespoke"}, 2, "CAL1"),
+        ("severe", {"Elapsed Time": "above six months", "Equipment": "bespoke"}, 2, "CAL2"),
+        ("negligible", {}, 1, None),
+    ],
+)
+def test_risk_and_cal(impact, ratings, risk, cal):
+    risks = determine_risk(damages(**{"Safety Impact": impact}), paths(**ratings))
+    assert risks["Impact"][0] == impact
+    assert risks["Risk Value"][0] == risk
+    assert risks["CAL"][0] == cal
+
+
+def test_worst_impact_category_counts():
+    risks = determine_risk(
+        damages(**{"Privacy Impact": "major", "Operational Impact": "moderate"}),
+        paths(),
+    )
+    assert risks["Impact"][0] == "major"
+
+
+def test_damage_without_attack_path_has_no_risk():
+    risks = determine_risk(damages(**{"Safety Impact": "severe"}), paths().iloc[0:0])
+    assert risks["Attack Feasibility"][0] is None
+    assert risks["Risk Value"][0] is None
+    assert risks["CAL"][0] is None
@@ -0,0 +1,51 @@
+import networkx as nx
+import pytest
+from graph.snapshot import GraphSnapshot
+
+
+def snapshot(edges, rel_type="Possible_Attack"):
+    names = sorted({node for edge in edges for node in edge})
+    return GraphSnapshot(
+        [{"node_id": name, "node_name": name} for name in names],
+        [(source, rel_type, target) for source, target in edges],
+    )
+
+
+# two entry points reaching the asset over a diamond and a shortcut
+EDGES = [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("e", "d"), ("d", "t")]
+
+
+def test_cheapest_paths_are_ordered_by_cost():
+    paths = snapshot(EDGES).cheapest_paths(["a", "e"], "t", k=5)
+    assert paths[0] == (3.0, ["e", "d", "t"])
+    assert sorted(p for _, p in paths[1:]) == [["a", "b", "d", "t"], ["a", "c", "d", "t"]]
+    assert [cost for cost, _ in paths] == [3.0, 4.0, 4.0]
+
+
+def test_node_costs_change_the_order():
+    paths = snapshot(EDGES).cheapest_paths(
+        ["a", "e"], "t", k=2, node_costs={"e": 10, "b": 0.5}
+    )
+    assert paths == [(3.5, ["a", "b", "d", "t"]), (4.0, ["a", "c", "d", "t"])]
+
+
+def test_cheapest_paths_match_all_simple_paths():
+    edges = [(f"n{i}", f"n{j}") for i in range(6) for j in range(6) if i != j and (i * j) % 4 != 1]
+    paths = snapshot(edges).cheapest_paths(["n0"], "n5", k=20)
+    expected = sorted(len(p) for p in nx.all_simple_paths(nx.DiGraph(edges), "n0", "n5"))
+    assert [cost for cost, _ in paths] == expected[:20]
+    assert len({tuple(p) for _, p in paths}) == len(paths)
+
+
+def test_unreachable_target_has_no_paths():
+    assert snapshot(EDGES).cheapest_paths(["t"], "a") == []
+
+
+def test_pagerank_without_scipy():
+    cycle = snapshot([("a", "b"), ("b", "c"), ("c", "a")]).centrality("pagerank")
+    assert cycle == pytest.approx({"a": 1 / 3, "b": 1 / 3, "c": 1 / 3})
+
+    # the hub has no outgoing edges, its rank is spread evenly
+    star = snapshot([("a", "hub"), ("b", "hub"), ("c", "hub")]).centrality("pagerank")
+    assert sum(star.values()) == pytest.approx(1)
+    assert star["hub"] > star["a"] == pytest.approx(star["b"])
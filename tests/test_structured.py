@@ -0,0 +1,71 @@
+from enum import Enum
+from typing import List
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.outputs import Generation
+from langchain_core.pydantic_v1 import BaseModel, Field
+from llm.structured import RepairingJsonOutputParser, compact_schema, repair_json
+
+
+class Level(Enum):
+    LOW = "low"
+    HIGH = "high"
+
+
+class Goal(BaseModel):
+    goal: str = Field(description="the goal")
+    level: Level = Field(description="the level")
+
+
+class Goals(BaseModel):
+    goals: List[Goal] = Field(description="list of goals")
+
+
+def parse(text, partial=False):
+    return RepairingJsonOutputParser().parse_result(
+        [Generation(text=text)], partial=partial
+    )
+
+
+def test_valid_json():
+    assert parse('{"goals": [{"goal": "a"}]}') == {"goals": [{"goal": "a"}]}
+
+
+def test_repairs_near_misses():
+    text = 'Here you go:\n```json\n{"a": [1, 2,], "b": True, "c": None,}\n```\nDone.'
+    assert parse(text) == {"a": [1, 2], "b": True, "c": None}
+
+
+def test_literals_inside_strings_are_kept():
+    assert parse('{"a": "True or None",}') == {"a": "True or None"}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"goals": [{"goal": "a"}, {"goal": "b"',
+        '{"goals": [{"goal": "a"}, {"goal": "cut off',
+        '{"goals": [{"goal": "a"}]',
+        "no json at all",
+    ],
+)
+def test_truncated_answers_raise(text):
+    with pytest.raises(OutputParserException):
+        parse(text)
+
+
+def test_mismatched_brackets_raise():
+    with pytest.raises(ValueError):
+        repair_json('{"a": [1, 2}')
+
+
+def test_partial_answers_are_closed_while_streaming():
+    assert parse('{"goals": [{"goal": "a"}, {"goal": "b', partial=True) == {
+        "goals": [{"goal": "a"}, {"goal": "b"}]
+    }
+
+
+def test_compact_schema():
+    assert compact_schema(Goals) == {
+        "goals": [{"goal": "str, the goal", "level": "low | high"}]
+    }
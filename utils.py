@@ -13,6 +13,8 @@ from pdfkit.api import configuration
 import pandas as pd 
 from enum import StrEnum
 import itertools
+from functools import lru_cache
+from llm.cache import SQLiteResponseCache
 
 def split_list(lst, val):
     return [list(group) for k, group in
@@ -70,6 +72,16 @@ class WindowEnum(StrEnum):
     def list(cls):
         return list(map(lambda c: c.value, cls))
     
+class FeasibilityEnum(StrEnum):
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+    VERY_LOW = "very low"
+
+    @classmethod
+    def list(cls):
+        return list(map(lambda c: c.value, cls))
+    
 class EquipmentEnum(StrEnum):
     STANDARD = "standard"
     SPECIALIZED = "specialized"
@@ -92,15 +104,21 @@ def save_as_pdf(data):
     options = {"enable-local-file-access":""} ## Access local files in .png/.jpeg format
     item = data.selected_item["item_name"]
 
-    report_data = [section_text("2. Asset Identification", data.assets.loc[:, data.assets.columns != "Rationale"])]
+    report_data = [section_text("2. Asset Identification", data.assets.loc[:, ~data.assets.columns.isin(["Element Id", "Rationale"])])]
     if "threats" in data:
-        report_data.append(section_text("3. Threat Scenario Specification", data.threats.loc[:, data.threats.columns != "Rationale"]))
+        report_data.append(section_text("3. Threat Scenario Specification", data.threats.loc[:, ~data.threats.columns.isin(["Asset Id", "Rationale"])]))
         if "damages" in data:
             report_data.append(section_text("4. Impact Analysis", data.damages.loc[:, data.damages.columns != "Rationale"]))
+            if "derived_impacts" in data:
+                report_data.append(section_text("Propagated Impact", data.derived_impacts))
             if "attack_paths" in data:
                 report_data.append(section_text("5. Attack Path Analysis", data.attack_paths.loc[:, data.attack_paths.columns != "Rationale"]))
+                if "asset_feasibility" in data:
+                    report_data.append(section_text("Attack Feasibility per Asset", data.asset_feasibility))
+                if "risks" in data:
+                    report_data.append(section_text("6. Risk Determination", data.risks[["Asset Name", "Threat Scenario", "Damage Scenario", "Impact", "Attack Feasibility", "Risk Value", "CAL"]]))
                 if "goals" in data:
-                    report_data.append(section_text("6. Goal Identification", data.goals))
+                    report_data.append(section_text("7. Goal Identification", data.goals))
                     
         
     report_content = f"""
@@ -138,6 +156,16 @@ class BaseLogger:
 ollama_base_url = st.secrets["OLLAMA_BASE_URL"]
 embedding_model_name = st.secrets["EMBEDDING_MODEL"]
 llm_name = st.secrets["LLM"]
+# context window of Ollama models; prompts are chunked to fit into it
+num_ctx = int(st.secrets.get("NUM_CTX", 3072))
+# number of prompts sent to the LLM at the same time
+llm_max_concurrency = int(st.secrets.get("LLM_MAX_CONCURRENCY", 4))
+# persistent cache of LLM responses, disabled with LLM_CACHE_MAX_ENTRIES = 0
+llm_cache_path = st.secrets.get("LLM_CACHE_PATH", "./llm_cache/responses.sqlite")
+llm_cache_ttl = float(st.secrets.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+llm_cache_max_entries = int(st.secrets.get("LLM_CACHE_MAX_ENTRIES", 10000))
+# constrain Ollama models to JSON output in the TARA step chains
+llm_json_mode = str(st.secrets.get("LLM_JSON_MODE", "true")).lower() == "true"
 
 
 def load_embedding_model(
@@ -168,24 +196,37 @@ def load_embedding_model(
     return embeddings, dimension
 
 
+@lru_cache(maxsize=None)
+def load_llm_cache():
+    """The process-wide LLM response cache, None if disabled."""
+    if llm_cache_max_entries <= 0:
+        return None
+    return SQLiteResponseCache(llm_cache_path, llm_cache_ttl, llm_cache_max_entries)
+
+
 def load_llm(
-    llm_name=llm_name, logger=BaseLogger(), config={"ollama_base_url": ollama_base_url}
+    llm_name=llm_name,
+    logger=BaseLogger(),
+    config={"ollama_base_url": ollama_base_url},
+    cache=None,
+    json_mode=False,
 ):
     if llm_name == "gpt-4":
         logger.info("LLM: Using GPT-4")
-        return ChatOpenAI(temperature=0, model_name=llm_name, streaming=True)
+        return ChatOpenAI(temperature=0, model_name=llm_name, streaming=True, cache=cache)
     elif llm_name == "gpt-4o":
         logger.info("LLM: Using GPT-4o")
-        return ChatOpenAI(temperature=0, model_name=llm_name, streaming=True)
+        return ChatOpenAI(temperature=0, model_name=llm_name, streaming=True, cache=cache)
     elif llm_name == "gpt-3.5":
         logger.info("LLM: Using GPT-3.5")
-        return ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo", streaming=True)
+        return ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo", streaming=True, cache=cache)
     elif llm_name == "claudev2":
         logger.info("LLM: ClaudeV2")
         return BedrockChat(
             model_id="anthropic.claude-v2",
             model_kwargs={"temperature": 0.0, "max_tokens_to_sample": 1024},
             streaming=True,
+            cache=cache,
         )
     elif len(llm_name):
         logger.info(f"LLM: Using Ollama: {llm_name}")
@@ -194,11 +235,13 @@ def load_llm(
             base_url=config["ollama_base_url"],
             model=llm_name,
             streaming=True,
+            cache=cache,
+            format="json" if json_mode else None,
             # seed=2,
             top_k=10,  # A higher value (100) will give more diverse answers, while a lower value (10) will be more conservative.
             top_p=0.3,  # Higher value (0.95) will lead to more diverse text, while a lower value (0.5) will generate more focused text.
-            num_ctx=3072,  # Sets the size of the context window used to generate the next token.
+            num_ctx=num_ctx,  # Sets the size of the context window used to generate the next token.
         )
     logger.info("LLM: Using GPT-3.5")
-    return ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo", streaming=True)
+    return ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo", streaming=True, cache=cache)
 